@@ -0,0 +1,129 @@
+from html_generator import generate_html_from_usx
+from parse_cache import load_book
+from pdf_generator import get_renderer
+from pdf_optimize import write_document
+from timings import NO_TIMINGS, StageTimings
+
+
+class RenderResult:
+    """
+    The outcome of rendering one book.
+
+    Attributes:
+        pdf: The PDF as bytes, or None if it was written to a target
+        page_count: Number of pages in the PDF
+        timings: Stage timings as from StageTimings.to_dict, or None
+    """
+
+    def __init__(self, pdf, page_count, timings=None):
+        self.pdf = pdf
+        self.page_count = page_count
+        self.timings = timings
+
+    def __repr__(self):
+        size = "written" if self.pdf is None else f"{len(self.pdf)} bytes"
+        return f"<RenderResult {self.page_count} pages, {size}>"
+
+
+def read_usfm(usfm):
+    """Return USFM given as str, bytes or a text or binary file object as str."""
+    if hasattr(usfm, "read"):
+        usfm = usfm.read()
+    if isinstance(usfm, bytes):
+        return usfm.decode("utf-8-sig")
+    return usfm.removeprefix("\ufeff")
+
+
+def warm_renderer(header="", font_url=None, font_dir=None):
+    """Compile stylesheets and load fonts ahead of the first render."""
+    get_renderer(font_dir).warm(header, font_url)
+
+
+def render_usfm_to(
+    usfm,
+    target,
+    header="",
+    font_url=None,
+    font_dir=None,
+    pdf_options=None,
+    parse_cache=None,
+    timings=False,
+    html_cache=None,
+):
+    """
+    Render a USFM book to PDF, writing it to target.
+
+    Nothing but the PDF itself (and the parse cache, if given) touches the
+    filesystem, and the process-wide renderer from get_renderer is reused, so
+    stylesheets and fonts are only loaded by the first call.
+
+    Args:
+        usfm: USFM as str, bytes, or a text or binary file object
+        target: Output path or writable binary file object; None returns the
+            PDF as bytes in the result
+        header: Header text printed at the top of every page
+        font_url: Google Fonts CSS URL to use instead of Noto Serif
+        font_dir: Directory of pre-provisioned fonts or the font cache to use
+        pdf_options: Optional font embedding and compression options from
+            pdf_optimize.get_pdf_options
+        parse_cache: Optional parse_cache.ParseCache to reuse parsed books from
+        timings: Whether to record stage timings (memory tracing slows
+            rendering down)
+        html_cache: Optional html_cache.HtmlCache to reuse the HTML of
+            unchanged chapters from, e.g. across editions with different headers
+
+    Returns:
+        A RenderResult
+    """
+    stage_timings = StageTimings() if timings else NO_TIMINGS
+
+    with stage_timings.stage("read"):
+        usfm_str = read_usfm(usfm)
+
+    with stage_timings.stage("parse"):
+        book = load_book(usfm_str, parse_cache)
+
+    with stage_timings.stage("html"):
+        html_content = generate_html_from_usx(book, html_cache)
+
+    document = get_renderer(font_dir).render_document(
+        html_content, header=header, font_url=font_url, timings=stage_timings
+    )
+
+    with stage_timings.stage("write"):
+        pdf = write_document(document, target, pdf_options)
+
+    return RenderResult(
+        pdf, len(document.pages), stage_timings.to_dict() if timings else None
+    )
+
+
+def render_usfm(
+    usfm,
+    header="",
+    font_url=None,
+    font_dir=None,
+    pdf_options=None,
+    parse_cache=None,
+    timings=False,
+    html_cache=None,
+):
+    """
+    Render a USFM book to PDF in memory.
+
+    Arguments are as for render_usfm_to().
+
+    Returns:
+        A RenderResult whose pdf attribute holds the PDF bytes
+    """
+    return render_usfm_to(
+        usfm,
+        None,
+        header=header,
+        font_url=font_url,
+        font_dir=font_dir,
+        pdf_options=pdf_options,
+        parse_cache=parse_cache,
+        timings=timings,
+        html_cache=html_cache,
+    )
@@ -0,0 +1,232 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from api import read_usfm, render_usfm, warm_renderer
+from html_cache import HtmlCache
+from parse_cache import ParseCache
+from workers import Worker, describe_exit_code
+
+EXECUTOR_KINDS = ("process", "thread")
+
+
+def get_process_context():
+    # Worker processes are replaced while the event loop's threads are
+    # running, which makes forking unsafe, so start them afresh instead
+    return multiprocessing.get_context("spawn")
+
+
+def render_task(task):
+    """Render one book in a worker process, returning (result, error message)."""
+    usfm_str, options = task
+    try:
+        return render_usfm(usfm_str, **options), None
+    except Exception as e:
+        return None, str(e)
+
+
+def send_and_wait(connection, task):
+    """Send a task to a worker, then block until it answers or exits."""
+    connection.send(task)
+    connection.poll(None)
+
+
+def render_in_thread(usfm_str, options):
+    """Render in a worker thread, reporting any failure as a RuntimeError."""
+    try:
+        return render_usfm(usfm_str, **options)
+    except Exception as e:
+        raise RuntimeError(str(e)) from e
+
+
+class AsyncRenderer:
+    """
+    Render USFM from asyncio code without blocking the event loop.
+
+    At most max_concurrency books render at once; further calls wait their
+    turn, and the timeout only starts once a render has its slot. With the
+    "process" executor each slot has a worker process with a warmed renderer,
+    reused from book to book. A worker whose render is cancelled, exceeds its
+    timeout or crashes is killed and replaced, so a pathological book can't
+    hold on to a slot. The "thread" executor avoids
+    starting processes, but a thread can't be stopped: a cancelled or
+    timed-out render keeps running in the background, and keeps its slot until
+    it finishes, although its result is discarded.
+
+    Usage:
+        async with AsyncRenderer(max_concurrency=4, timeout=60) as renderer:
+            result = await renderer.render(usfm_text, header="Genesis")
+    """
+
+    def __init__(
+        self,
+        max_concurrency=4,
+        executor="process",
+        timeout=None,
+        header="",
+        font_url=None,
+        font_dir=None,
+        pdf_options=None,
+        use_parse_cache=True,
+        use_html_cache=True,
+    ):
+        """
+        Args:
+            max_concurrency: Maximum number of books rendering at once
+            executor: "process" or "thread"
+            timeout: Default seconds a book may take to render, or None
+            header: Default header text printed at the top of every page
+            font_url: Google Fonts CSS URL to use instead of Noto Serif
+            font_dir: Directory of pre-provisioned fonts or the font cache to use
+            pdf_options: Optional font embedding and compression options from
+                pdf_optimize.get_pdf_options
+            use_parse_cache: Whether to reuse parsed books from the parse cache
+            use_html_cache: Whether to reuse the HTML of unchanged chapters from
+                the HTML cache
+
+        The renderer is warmed here, in the calling thread, so create the
+        AsyncRenderer before the event loop starts serving requests. With the
+        "process" executor the worker processes are started here too, and
+        each warms its own renderer in the background.
+        """
+        if executor not in EXECUTOR_KINDS:
+            raise ValueError(f"executor must be one of {', '.join(EXECUTOR_KINDS)}")
+        self.executor = executor
+        self.timeout = timeout
+        self.header = header
+        self.options = {
+            "font_url": font_url,
+            "font_dir": font_dir,
+            "pdf_options": pdf_options,
+            "parse_cache": ParseCache() if use_parse_cache else None,
+            "html_cache": HtmlCache() if use_html_cache else None,
+        }
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Threads that wait for child processes, or that render themselves;
+        # a render holding a slot always has a thread to itself
+        self.threads = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.context = get_process_context()
+        self.closed = False
+        # Idle worker processes, for the "process" executor
+        self.workers = []
+        # Warm the fonts into the cache once, before any worker needs them
+        warm_renderer(header, font_url, font_dir)
+        if executor == "process":
+            self.workers = [self.start_worker() for _ in range(max_concurrency)]
+
+    async def render(self, usfm, header=None, timeout=None):
+        """
+        Render a USFM book to PDF.
+
+        Args:
+            usfm: USFM as str, bytes, or a text or binary file object
+            header: Header text, overriding the renderer's default
+            timeout: Seconds the render may take, overriding the default;
+                time spent waiting for a free slot doesn't count
+
+        Returns:
+            An api.RenderResult
+
+        Raises:
+            TimeoutError: If the render took longer than the timeout
+            RuntimeError: If the render failed
+        """
+        usfm_str = read_usfm(usfm)
+        options = dict(self.options, header=self.header if header is None else header)
+        timeout = self.timeout if timeout is None else timeout
+
+        await self.semaphore.acquire()
+        # The slot is released once the render has really finished, not when
+        # the caller stops waiting for it
+        try:
+            if self.closed:
+                raise RuntimeError("the renderer is closed")
+            if self.executor == "thread":
+                render = self.start_thread_render(usfm_str, options)
+            else:
+                render = asyncio.ensure_future(
+                    self.render_in_process(usfm_str, options)
+                )
+                render.add_done_callback(lambda _: self.semaphore.release())
+        except BaseException:
+            self.semaphore.release()
+            raise
+        try:
+            return await asyncio.wait_for(asyncio.shield(render), timeout)
+        except BaseException:
+            # Kills the worker process of a render; a render thread carries on
+            render.cancel()
+            raise
+
+    def start_thread_render(self, usfm_str, options):
+        loop = asyncio.get_running_loop()
+        future = self.threads.submit(render_in_thread, usfm_str, options)
+        future.add_done_callback(lambda _: self.release_from_thread(loop))
+        return asyncio.wrap_future(future)
+
+    def release_from_thread(self, loop):
+        try:
+            loop.call_soon_threadsafe(self.semaphore.release)
+        except RuntimeError:
+            # The event loop has closed, and the slot with it
+            pass
+
+    def start_worker(self):
+        return Worker(
+            self.context,
+            render_task,
+            warm_renderer,
+            (self.header, self.options["font_url"], self.options["font_dir"]),
+        )
+
+    async def render_in_process(self, usfm_str, options):
+        loop = asyncio.get_running_loop()
+        # A slot always has a worker: idle, or started to replace a killed one
+        worker = self.workers.pop() if self.workers else self.start_worker()
+        # The task is sent from a thread too, as a worker that is still warming
+        # up doesn't read it yet
+        waiting = None
+        is_reusable = False
+        try:
+            waiting = self.threads.submit(
+                send_and_wait, worker.connection, (usfm_str, options)
+            )
+            try:
+                await asyncio.wrap_future(waiting)
+                (result, error), _ = worker.connection.recv()
+            except (EOFError, OSError):
+                await loop.run_in_executor(None, worker.process.join)
+                raise RuntimeError(
+                    f"render failed: {describe_exit_code(worker.process.exitcode)}"
+                ) from None
+            is_reusable = True
+            if error is not None:
+                raise RuntimeError(error)
+            return result
+        finally:
+            if is_reusable and not self.closed:
+                self.workers.append(worker)
+            else:
+                # Also reached on cancellation and timeout, which stop the render
+                worker.process.kill()
+                await loop.run_in_executor(None, worker.process.join)
+                if waiting is None:
+                    worker.connection.close()
+                else:
+                    # The waiting thread returns once the worker is gone
+                    waiting.add_done_callback(lambda _: worker.connection.close())
+                if not self.closed:
+                    self.workers.append(self.start_worker())
+
+    def close(self):
+        """Stop the idle workers, and release the threads once renders finish."""
+        self.closed = True
+        self.threads.shutdown(wait=False)
+        for worker in self.workers:
+            worker.kill()
+        self.workers = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,87 @@
+"""
+Compare the compact document model with the USX tree it is built from.
+
+Usage:
+    python -m benchmarks.bench_document_model [--sizes 10 50 150 1189]
+
+For synthetic books of increasing chapter counts, reports the memory held
+by the loaded USX tree and by the equivalent document_model.Book (each
+loaded in a fresh process and measured as its growth in RSS), the size of
+each serialized, and the time to load each from its serialized form and to
+generate HTML from it (for USX, that includes building a Book).
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from lxml import etree
+from document_model import Book, build_book
+from html_generator import generate_html_from_usx
+from parse_cache import parse_usfm
+from workers import get_rss_bytes
+from benchmarks.synthetic import generate_usfm
+
+
+def load_usx(data):
+    return etree.fromstring(data)
+
+
+def measure_loaded_rss(load, data, results):
+    rss_before = get_rss_bytes(os.getpid())
+    document = load(data)
+    results.put(get_rss_bytes(os.getpid()) - rss_before)
+    del document
+
+
+def measure_rss(load, data):
+    # A fresh process each time, so memory freed by one load can't be reused
+    # by the next
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=measure_loaded_rss, args=(load, data, results))
+    process.start()
+    rss = results.get()
+    process.join()
+    return rss
+
+
+def best_of(function, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 50, 150, 1189], help="Chapters"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'chapters':>8} {'':>5} {'RSS MiB':>8} {'file KiB':>9} "
+        f"{'load ms':>8} {'html ms':>8}"
+    )
+    for chapters in args.sizes:
+        usx_elem = parse_usfm(
+            generate_usfm(chapters=chapters, poetry=0.3, divine_name=0.2)
+        )
+        book = build_book(usx_elem)
+        usx_data = etree.tostring(usx_elem)
+        book_data = book.to_bytes()
+        rows = [
+            ("USX", load_usx, usx_data, usx_elem),
+            ("Book", Book.from_bytes, book_data, book),
+        ]
+        for name, load, data, document in rows:
+            print(
+                f"{chapters:>8} {name:>5} {measure_rss(load, data) / 2**20:>8.2f} "
+                f"{len(data) / 1024:>9.0f} "
+                f"{best_of(lambda: load(data)) * 1000:>8.1f} "
+                f"{best_of(lambda: generate_html_from_usx(document)) * 1000:>8.1f}"
+            )
+        build_seconds = best_of(lambda: build_book(usx_elem))
+        print(f"{'':>8} building the Book from USX: {build_seconds * 1000:.1f} ms")
@@ -0,0 +1,66 @@
+"""
+Time HTML generation with the chapter-level HTML cache.
+
+Usage:
+    python -m benchmarks.bench_html_cache [--chapters N] [--edits N] [--repeat N]
+
+A synthetic book is generated without the cache, with an empty (cold) cache,
+with a warm cache, and as a second edition with a few chapters edited, which
+regenerates only those chapters. The cache lives in a temporary directory.
+"""
+import argparse
+import tempfile
+import time
+from document_model import build_book
+from html_cache import HtmlCache
+from html_generator import generate_html_from_usx
+from parse_cache import parse_usfm
+from benchmarks.synthetic import generate_usfm
+
+
+def best_of(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def edit_chapters(usfm, edits):
+    # Lengthen the first verse of the first few chapters
+    return usfm.replace("\\v 1 ", "\\v 1 Edited. ", edits)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chapters", type=int, default=1189)
+    parser.add_argument("--edits", type=int, default=3, help="Chapters to edit")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    usfm = generate_usfm(chapters=args.chapters, poetry=0.3, divine_name=0.2)
+    book = build_book(parse_usfm(usfm))
+    edition = build_book(parse_usfm(edit_chapters(usfm, args.edits)))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        html_cache = HtmlCache(cache_dir)
+        rows = [
+            ("no cache", best_of(lambda: generate_html_from_usx(book), args.repeat)),
+            (
+                "cold cache",
+                best_of(lambda: generate_html_from_usx(book, html_cache), 1),
+            ),
+            (
+                "warm cache",
+                best_of(lambda: generate_html_from_usx(book, html_cache), args.repeat),
+            ),
+            (
+                f"{args.edits} chapter(s) edited",
+                best_of(lambda: generate_html_from_usx(edition, html_cache), 1),
+            ),
+        ]
+
+    print(f"{args.chapters} chapters")
+    for name, seconds in rows:
+        print(f"{name:>22}: {seconds * 1000:8.1f} ms")
@@ -0,0 +1,133 @@
+"""
+Time the hot-path markup of the HTML generator in isolation.
+
+Compares building verse number spans and paragraph open tags with an f-string
+and escape() per occurrence against the precomputed fragment tables, and
+escaping each text run separately against escaping all runs of a chunk in one
+call. The whole generator is then timed from a prebuilt document_model.Book
+against the original implementation from USX, and building the Book is timed
+separately.
+
+Usage:
+    python -m benchmarks.bench_html_fragments [--repeat N]
+"""
+import argparse
+import time
+from html import escape
+from document_model import build_book
+from html_generator import (
+    PARA_OPEN_TAGS,
+    VERSE_NUMBER_SPANS,
+    generate_html_from_usx,
+)
+from parse_cache import parse_usfm
+from benchmarks.legacy_html import legacy_generate_html_from_usx
+from benchmarks.synthetic import generate_usfm
+
+
+def best_of(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def collect_items(usx_elem):
+    verse_numbers = [
+        verse.get("number")
+        for verse in usx_elem.iter("verse")
+        if verse.get("number") not in (None, "1")
+    ]
+    para_classes = [para.get("style", "p") for para in usx_elem.iter("para")]
+    texts = [
+        text
+        for para in usx_elem.iter("para")
+        for elem in para.iter()
+        for text in (elem.text, elem.tail if elem is not para else None)
+        if text
+    ]
+    return verse_numbers, para_classes, texts
+
+
+def format_spans(verse_numbers):
+    return [
+        f'<span class="verse-number">{escape(number)}</span>'
+        for number in verse_numbers
+    ]
+
+
+def lookup_spans(verse_numbers):
+    return [VERSE_NUMBER_SPANS[number] for number in verse_numbers]
+
+
+def format_tags(para_classes):
+    return [f'<p class="{para_class}">' for para_class in para_classes]
+
+
+def lookup_tags(para_classes):
+    return [PARA_OPEN_TAGS[para_class] for para_class in para_classes]
+
+
+def escape_each(texts):
+    return [escape(text) for text in texts]
+
+
+def escape_batch(texts):
+    # NUL can't occur in XML text, so it safely separates the runs
+    return escape("\0".join(texts)).split("\0")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # Roughly the size of the Protestant canon: 1,189 chapters, 31,000 verses
+    usx_elem = parse_usfm(
+        generate_usfm(
+            chapters=1189,
+            verses_per_chapter=26,
+            poetry=0.3,
+            divine_name=0.2,
+            intro_paragraphs=20,
+        )
+    )
+    book = build_book(usx_elem)
+    verse_numbers, para_classes, texts = collect_items(usx_elem)
+    assert format_spans(verse_numbers) == lookup_spans(verse_numbers)
+    assert format_tags(para_classes) == lookup_tags(para_classes)
+    assert escape_each(texts) == escape_batch(texts)
+
+    comparisons = [
+        (
+            f"verse number spans ({len(verse_numbers)})",
+            lambda: format_spans(verse_numbers),
+            lambda: lookup_spans(verse_numbers),
+        ),
+        (
+            f"paragraph open tags ({len(para_classes)})",
+            lambda: format_tags(para_classes),
+            lambda: lookup_tags(para_classes),
+        ),
+        (
+            f"text escaping, batched ({len(texts)})",
+            lambda: escape_each(texts),
+            lambda: escape_batch(texts),
+        ),
+        (
+            "whole generator vs. legacy",
+            lambda: legacy_generate_html_from_usx(usx_elem),
+            lambda: generate_html_from_usx(book),
+        ),
+    ]
+    for name, before, after in comparisons:
+        before_seconds = best_of(before, args.repeat)
+        after_seconds = best_of(after, args.repeat)
+        print(
+            f"{name:>36}: {before_seconds * 1000:8.2f} ms -> "
+            f"{after_seconds * 1000:8.2f} ms ({before_seconds / after_seconds:.2f}x)"
+        )
+    build_seconds = best_of(lambda: build_book(usx_elem), args.repeat)
+    print(f"{'building the Book from USX':>36}: {build_seconds * 1000:8.2f} ms")
@@ -0,0 +1,87 @@
+"""
+Compare generate_html_from_usx against the original iter()-based generator.
+
+Usage:
+    python -m benchmarks.bench_html_generator ["path/to/bible/*.sfm"] [--repeat N]
+
+Without a pattern, a synthetic Bible-sized corpus (~31,000 verses) is used.
+The current generator is timed both from the USX, building the
+document_model.Book first as a cold run does, and from a prebuilt Book, as
+loaded from the parse cache when the USFM hasn't changed.
+"""
+import argparse
+import glob
+import statistics
+import time
+from document_model import build_book
+from html_generator import generate_html_from_usx
+from parse_cache import parse_usfm
+from benchmarks.legacy_html import legacy_generate_html_from_usx
+from benchmarks.synthetic import generate_usfm
+
+
+def load_books(pattern):
+    if pattern:
+        books = []
+        for path in sorted(glob.glob(pattern)):
+            with open(path, "r", encoding="utf-8-sig") as f:
+                books.append(parse_usfm(f.read()))
+        return books
+
+    # Roughly the size of the Protestant canon: 1,189 chapters, 31,000 verses
+    return [
+        parse_usfm(
+            generate_usfm(
+                chapters=1189,
+                verses_per_chapter=26,
+                poetry=0.3,
+                divine_name=0.2,
+                intro_paragraphs=20,
+            )
+        )
+    ]
+
+
+def time_generator(generator, documents, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for document in documents:
+            generator(document)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pattern", nargs="?", help="Glob pattern of USFM files")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    books = load_books(args.pattern)
+    verse_count = sum(
+        1
+        for usx_elem in books
+        for verse in usx_elem.iter("verse")
+        if verse.get("number")
+    )
+    print(f"{len(books)} book(s), {verse_count} verses")
+
+    document_books = [build_book(usx_elem) for usx_elem in books]
+    legacy_seconds = time_generator(legacy_generate_html_from_usx, books, args.repeat)
+    cold_seconds = time_generator(
+        lambda usx_elem: generate_html_from_usx(build_book(usx_elem)),
+        books,
+        args.repeat,
+    )
+    warm_seconds = time_generator(generate_html_from_usx, document_books, args.repeat)
+    rows = [
+        ("legacy, from USX", legacy_seconds),
+        ("current, building the Book", cold_seconds),
+        ("current, from a cached Book", warm_seconds),
+    ]
+    for name, elapsed in rows:
+        print(
+            f"{name:>28}: {elapsed:.3f}s {verse_count / elapsed:10.0f} verses/s "
+            f"({legacy_seconds / elapsed:.2f}x)"
+        )
@@ -0,0 +1,55 @@
+"""
+Compare peak memory of building the whole HTML string against streaming it.
+
+Usage:
+    python -m benchmarks.bench_html_memory [--sizes 10 50 150 500]
+
+For synthetic books of increasing chapter counts, reports the peak Python
+heap (tracemalloc) while generating HTML from a prebuilt document_model.Book,
+excluding the Book itself, and separately while building the Book from USX.
+"""
+import argparse
+import os
+import tracemalloc
+from document_model import build_book
+from html_generator import generate_html_from_usx, write_html_from_usx
+from parse_cache import parse_usfm
+from benchmarks.synthetic import generate_usfm
+
+
+def measure_peak(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def build_string(book):
+    generate_html_from_usx(book)
+
+
+def stream_to_devnull(book):
+    with open(os.devnull, "w", encoding="utf-8") as f:
+        write_html_from_usx(book, f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 50, 150, 500], help="Chapters"
+    )
+    args = parser.parse_args()
+
+    print(f"{'chapters':>8} {'string MiB':>12} {'stream MiB':>12} {'build MiB':>12}")
+    for chapters in args.sizes:
+        usx_elem = parse_usfm(generate_usfm(chapters=chapters))
+        build_peak = measure_peak(lambda: build_book(usx_elem))
+        book = build_book(usx_elem)
+        string_peak = measure_peak(lambda: build_string(book))
+        stream_peak = measure_peak(lambda: stream_to_devnull(book))
+        print(
+            f"{chapters:>8} {string_peak / 2**20:>12.2f} "
+            f"{stream_peak / 2**20:>12.2f} {build_peak / 2**20:>12.2f}"
+        )
@@ -0,0 +1,78 @@
+"""
+Compare rendering from a temporary HTML file against rendering from memory.
+
+Usage:
+    python -m benchmarks.bench_html_source [path/to/PSA.sfm] [--repeat N]
+
+Without a path, a synthetic Psalms-sized book is generated.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from usfm_grammar import USFMParser
+from weasyprint import HTML
+from html_generator import generate_html_from_usx
+from pdf_generator import PdfRenderer
+from benchmarks.synthetic import generate_usfm
+
+
+def render_via_tempfile(html_content, renderer):
+    # The approach usx_to_pdf used before rendering from memory
+    with tempfile.NamedTemporaryFile(
+        suffix=".html", delete=False, mode="w", encoding="utf-8"
+    ) as f:
+        f.write(html_content)
+        temp_html_path = f.name
+    try:
+        return HTML(filename=temp_html_path).write_pdf(
+            stylesheets=renderer.get_stylesheets("Benchmark"),
+            font_config=renderer.font_config,
+        )
+    finally:
+        os.unlink(temp_html_path)
+
+
+def render_from_string(html_content, renderer):
+    return HTML(string=html_content).write_pdf(
+        stylesheets=renderer.get_stylesheets("Benchmark"),
+        font_config=renderer.font_config,
+    )
+
+
+def time_call(function, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("usfm_file", nargs="?", help="USFM file to render")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.usfm_file:
+        with open(args.usfm_file, "r", encoding="utf-8-sig") as f:
+            usfm = f.read()
+    else:
+        usfm = generate_usfm()
+
+    usx_elem = USFMParser(usfm).to_usx(ignore_errors=True)
+    html_content = generate_html_from_usx(usx_elem)
+    renderer = PdfRenderer()
+    print(f"HTML size: {len(html_content.encode('utf-8')) / 1024:.0f} KiB")
+
+    # Warm up fonts and caches before timing either variant
+    render_from_string(html_content, renderer)
+
+    for name, function in [
+        ("tempfile", render_via_tempfile),
+        ("in-memory", render_from_string),
+    ]:
+        elapsed = time_call(function, html_content, renderer, repeat=args.repeat)
+        print(f"{name:>10}: {elapsed:.3f}s (median of {args.repeat})")
@@ -0,0 +1,73 @@
+"""
+Report the PDF size and render time of each font and compression option.
+
+Usage:
+    python -m benchmarks.bench_pdf_options [path/to/PSA.sfm] [--repeat N]
+
+Without a path, a synthetic Psalms-sized book is generated. Sizes are compared
+against a baseline with full fonts and no compression, so each row shows what
+an option saves and what it costs in render time.
+"""
+import argparse
+import statistics
+import time
+from usfm_grammar import USFMParser
+from html_generator import generate_html_from_usx
+from pdf_generator import PdfRenderer
+from pdf_optimize import get_pdf_options
+from benchmarks.synthetic import generate_usfm
+
+OPTION_SETS = [
+    ("baseline", get_pdf_options(full_fonts=True, compression="none")),
+    ("subset", get_pdf_options(compression="none")),
+    ("subset+hinting", get_pdf_options(hinting=True, compression="none")),
+    ("compressed", get_pdf_options(full_fonts=True)),
+    ("default", get_pdf_options()),
+    ("deduplicate", get_pdf_options(deduplicate=True)),
+    ("max", get_pdf_options(compression="max")),
+]
+
+
+def render(renderer, html_content, pdf_options):
+    return renderer.render_html(
+        html_content, header="Benchmark", pdf_options=pdf_options
+    )
+
+
+def time_render(renderer, html_content, pdf_options, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pdf = render(renderer, html_content, pdf_options)
+        timings.append(time.perf_counter() - start)
+    return len(pdf), statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("usfm_file", nargs="?", help="USFM file to render")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.usfm_file:
+        with open(args.usfm_file, "r", encoding="utf-8-sig") as f:
+            usfm = f.read()
+    else:
+        usfm = generate_usfm()
+
+    usx_elem = USFMParser(usfm).to_usx(ignore_errors=True)
+    html_content = generate_html_from_usx(usx_elem)
+    renderer = PdfRenderer()
+
+    # Warm up fonts and caches before timing any option
+    render(renderer, html_content, None)
+
+    baseline_size = None
+    print(f"{'option':>15} {'size KiB':>10} {'saved':>7} {'time':>8}")
+    for name, pdf_options in OPTION_SETS:
+        size, elapsed = time_render(
+            renderer, html_content, pdf_options, repeat=args.repeat
+        )
+        baseline_size = baseline_size or size
+        saved = 1 - size / baseline_size
+        print(f"{name:>15} {size / 1024:>10.1f} {saved:>7.1%} {elapsed:>7.3f}s")
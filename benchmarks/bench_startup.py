@@ -0,0 +1,89 @@
+"""
+Time CLI startup: --help, and a no-op incremental run over a whole Bible.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat N]
+
+A synthetic book is written for each of the 66 canonical books, together with
+placeholder PDFs and a build manifest marking all of them up to date, so the
+incremental run only globs, hashes and checks the manifest. Each command is
+also checked for importing the heavy rendering dependencies.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from books import BOOK_ORDER
+from manifest import BuildManifest
+import main
+from benchmarks.synthetic import generate_usfm
+
+MAIN_PATH = os.path.abspath(main.__file__)
+HEAVY_MODULES = ("weasyprint", "usfm_grammar", "pypdf", "lxml")
+BIBLE_BOOKS = BOOK_ORDER[BOOK_ORDER.index("GEN") : BOOK_ORDER.index("REV") + 1]
+
+
+def make_up_to_date_bible(directory):
+    """Write 66 books and mark placeholder PDFs for them as up to date."""
+    args = main.parse_arguments([os.path.join(directory, "*.usfm")])
+    render_options = main.get_render_options(args)
+    manifest = BuildManifest()
+    for index, book_code in enumerate(BIBLE_BOOKS):
+        input_file = os.path.join(directory, f"{index + 1:02d}{book_code}.usfm")
+        with open(input_file, "w", encoding="utf-8") as f:
+            f.write(generate_usfm(book_code, chapters=20, poetry=0.2, seed=index))
+        output_file = main.get_output_filename(input_file)
+        with open(output_file, "wb") as f:
+            f.write(b"%PDF-1.7\n")
+        build_hash = main.get_build_hash(
+            input_file, render_options, main.get_layout_options(args)
+        )
+        manifest.record(output_file, build_hash, input_file)
+
+
+def time_command(command, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            command, stdin=subprocess.DEVNULL, capture_output=True, text=True
+        )
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"{command} failed:\n{result.stdout}{result.stderr}")
+    return statistics.median(timings)
+
+
+def get_heavy_imports(command):
+    """Return which HEAVY_MODULES the command imports, using -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + command[1:],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+    )
+    imported = {line.rsplit("|", 1)[-1].strip() for line in result.stderr.splitlines()}
+    return [module for module in HEAVY_MODULES if module in imported]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        make_up_to_date_bible(directory)
+        pattern = os.path.join(directory, "*.usfm")
+        commands = [
+            ("python (baseline)", [sys.executable, "-c", "pass"]),
+            ("--help", [sys.executable, MAIN_PATH, "--help"]),
+            ("no-op 66 books", [sys.executable, MAIN_PATH, pattern]),
+            ("-n 66 books", [sys.executable, MAIN_PATH, pattern, "-n", "-f"]),
+        ]
+        for name, command in commands:
+            elapsed = time_command(command, repeat=args.repeat)
+            heavy = ", ".join(get_heavy_imports(command)) or "none"
+            print(f"{name:>18}: {elapsed:.3f}s (heavy imports: {heavy})")
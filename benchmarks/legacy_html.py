@@ -0,0 +1,121 @@
+"""
+The original generate_html_from_usx, kept as a baseline for benchmarks.
+
+It walks every descendant with usx_elem.iter() and chooses paragraph classes
+with an if/elif chain.
+"""
+from html import escape
+
+
+def legacy_generate_html_from_usx(usx_elem):
+    """Generate HTML content from USX element (pre-dispatch-table version)."""
+    # Start with HTML structure
+    html = [
+        "<!DOCTYPE html>",
+        "<html>",
+        "<head>",
+        '<meta charset="UTF-8">',
+        "<title>Bible Text</title>",
+        "</head>",
+        "<body>",
+        '<div class="side-notice">FOR REVIEW - NOTE: This document does not reflect all USFM content. Footnotes and other elements are omitted.</div>',
+        '<div class="bible-content">',
+    ]
+
+    # Process USX elements
+    book_title = ""
+    current_chapter = ""
+    has_printed_current_chapter = False
+    introductory_material = True
+
+    for elem in usx_elem.iter():
+        if elem.tag == "book":
+            book_title = elem.text or elem.get("code", "")
+            html.append(f'<h1 class="book-title">{escape(book_title)}</h1>')
+
+        elif elem.tag == "chapter":
+            chapter_num = elem.get("number", "")
+            if chapter_num:
+                introductory_material = False
+                current_chapter = chapter_num
+                has_printed_current_chapter = False
+                # html.append(f'<h2 class="chapter-number">Chapter {escape(chapter_num)}</h2>')
+
+        elif elem.tag == "para":
+            style_name = elem.get("style", "p")
+
+            # Determine paragraph class based on style
+            para_class = "paragraph"
+            if style_name in ["s", "s1", "s2"]:  # Section heading
+                para_class = "section-heading"
+            elif style_name == "q1":  # Poetry line
+                para_class = "poetry-q1"
+            elif style_name == "q2":  # Poetry line 2
+                para_class = "poetry-q2"
+            elif style_name == "b":  # Blank line
+                html.append('<div class="blank-line"></div>')
+                continue
+            elif introductory_material:
+                para_class = "introductory-material"
+
+            should_maybe_print_chapter = not (
+                para_class == "introductory-material" or para_class == "section-heading"
+            )
+            # Start paragraph
+            if should_maybe_print_chapter and not has_printed_current_chapter:
+                # We are going to add the chapter number to the first paragraph of the chapter
+                # so we need to suppress the indent
+                html.append(f'<p class="{para_class} suppress-indent">')
+                html.append(
+                    f'<span class="chapter-number">{escape(current_chapter)}</span>'
+                )
+                has_printed_current_chapter = True
+            else:
+                html.append(f'<p class="{para_class}">')
+
+            # Process paragraph content
+            if elem.text:
+                html.append(escape(elem.text))
+
+            for child in elem:
+                if child.tag == "verse" and child.get("number"):
+                    verse_num = child.get("number")
+                    if verse_num != "1":
+                        html.append(
+                            f'<span class="verse-number">{escape(verse_num)}</span>'
+                        )
+
+                    # Add verse text
+                    if child.text:
+                        html.append(escape(child.text))
+
+                elif child.tag == "char":
+                    style = child.get("style", "")
+                    if style == "nd":  # Divine name
+                        html.append(
+                            f'<span class="divine-name">{escape(child.text or "")}</span>'
+                        )
+                    else:
+                        html.append(escape(child.text or ""))
+
+                else:
+                    html.append(escape(child.text or ""))
+
+                # Add tail text
+                if child.tail:
+                    html.append(escape(child.tail))
+
+            # End paragraph
+            html.append("</p>")
+
+    # Add side note
+    html.append(
+        '<div class="side-note">DRAFT: This PDF does not reflect all USFM content. Footnotes and other elements are omitted.</div>'
+    )
+
+    # Close HTML structure
+    html.append("</div>")  # Close bible-content
+    html.append("</body>")
+    html.append("</html>")
+
+    return "\n".join(html)
@@ -0,0 +1,189 @@
+"""
+Benchmark the conversion pipeline on synthetic or real USFM.
+
+Times generate_html_from_usx, css_helper.generate_css and end-to-end rendering
+(HTML generation, layout and PDF writing with a warmed renderer) separately,
+and reports throughput in verses per second and the peak RSS of the run.
+
+Usage:
+    python -m benchmarks.run [--chapters N] [--verses N] [--poetry F] [--nd F]
+                             [--intro N] [--usfm FILE ...] [--repeat N]
+                             [--skip-pdf] [--output results.jsonl]
+                             [--compare baseline.jsonl]
+
+Each run appends one JSON line per corpus to --output, tagged with the git
+commit, so results from different commits can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from css_helper import generate_css
+from manifest import get_package_version
+from parse_cache import parse_usfm
+from html_generator import generate_html_from_usx
+from pdf_generator import PdfRenderer
+from timings import get_max_rss_bytes
+from benchmarks.synthetic import generate_usfm
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the USFM to PDF conversion pipeline"
+    )
+    parser.add_argument("--chapters", type=int, default=150)
+    parser.add_argument("--verses", type=int, default=16, help="Verses per chapter")
+    parser.add_argument("--words", type=int, default=18, help="Words per verse")
+    parser.add_argument(
+        "--poetry", type=float, default=1.0, help="Fraction of poetry verses"
+    )
+    parser.add_argument(
+        "--nd", type=float, default=0.1, help="Fraction of verses with \\nd"
+    )
+    parser.add_argument(
+        "--intro", type=int, default=0, help="Introduction paragraphs"
+    )
+    parser.add_argument(
+        "--usfm",
+        nargs="*",
+        default=[],
+        help="Real USFM files to benchmark instead of a synthetic book",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--skip-pdf",
+        action="store_true",
+        help="Skip the (slow) end-to-end PDF benchmark",
+    )
+    parser.add_argument("--output", help="Append results as JSON lines to this file")
+    parser.add_argument("--compare", help="JSON lines file of results to compare to")
+    return parser.parse_args()
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def count_verses(usx_elem):
+    return sum(1 for verse in usx_elem.iter("verse") if verse.get("number"))
+
+
+def time_call(function, repeat):
+    """Return the median wall time of function() over repeat calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def benchmark_corpus(name, usfm, args, renderer):
+    usx_elem = parse_usfm(usfm)
+    verse_count = count_verses(usx_elem)
+    results = {
+        "corpus": name,
+        "verses": verse_count,
+        "usfm_bytes": len(usfm.encode("utf-8")),
+    }
+
+    stages = [
+        ("html", lambda: generate_html_from_usx(usx_elem)),
+        ("css", lambda: generate_css("Benchmark")),
+    ]
+    if not args.skip_pdf:
+        # Compile stylesheets and load fonts before timing
+        renderer.warm("Benchmark")
+        stages.append(
+            ("pdf", lambda: renderer.render(usx_elem, header="Benchmark"))
+        )
+
+    for stage_name, function in stages:
+        seconds = time_call(function, args.repeat)
+        results[f"{stage_name}_seconds"] = seconds
+        results[f"{stage_name}_verses_per_second"] = verse_count / seconds
+
+    results["peak_rss_bytes"] = get_max_rss_bytes()
+    return results
+
+
+def get_corpora(args):
+    if args.usfm:
+        for path in args.usfm:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                yield os.path.basename(path), f.read()
+        return
+
+    name = (
+        f"synthetic-c{args.chapters}-v{args.verses}-w{args.words}"
+        f"-q{args.poetry}-nd{args.nd}-i{args.intro}"
+    )
+    yield name, generate_usfm(
+        chapters=args.chapters,
+        verses_per_chapter=args.verses,
+        words_per_verse=args.words,
+        poetry=args.poetry,
+        divine_name=args.nd,
+        intro_paragraphs=args.intro,
+    )
+
+
+def load_baseline(path):
+    """Return the latest result for each corpus in a JSON lines file."""
+    baseline = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                baseline[result["corpus"]] = result
+    return baseline
+
+
+def print_results(results, baseline=None):
+    print(f"{results['corpus']} ({results['verses']} verses)")
+    for stage_name in ["html", "css", "pdf"]:
+        if f"{stage_name}_seconds" not in results:
+            continue
+        seconds = results[f"{stage_name}_seconds"]
+        throughput = results[f"{stage_name}_verses_per_second"]
+        line = f"  {stage_name:>5}: {seconds:9.4f}s {throughput:12.0f} verses/s"
+
+        previous = (baseline or {}).get(results["corpus"], {})
+        if f"{stage_name}_seconds" in previous:
+            speedup = previous[f"{stage_name}_seconds"] / seconds
+            line += f"  {speedup:5.2f}x vs {previous['commit']}"
+        print(line)
+
+    if results["peak_rss_bytes"] is not None:
+        print(f"  peak RSS: {results['peak_rss_bytes'] / (1024 * 1024):.1f} MiB")
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    baseline = load_baseline(args.compare) if args.compare else None
+    renderer = PdfRenderer()
+    environment = {
+        "commit": get_git_commit(),
+        "python": platform.python_version(),
+        "weasyprint": get_package_version("weasyprint"),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+    }
+
+    for name, usfm in get_corpora(args):
+        results = {**environment, **benchmark_corpus(name, usfm, args, renderer)}
+        print_results(results, baseline)
+        if args.output:
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(results) + "\n")
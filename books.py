@@ -0,0 +1,27 @@
+# USFM book codes in canonical order: front matter, Old Testament, New
+# Testament, deuterocanonical books (in Paratext numbering), then back matter
+BOOK_ORDER = """
+FRT INT
+GEN EXO LEV NUM DEU JOS JDG RUT 1SA 2SA 1KI 2KI 1CH 2CH EZR NEH EST JOB PSA PRO
+ECC SNG ISA JER LAM EZK DAN HOS JOL AMO OBA JON MIC NAM HAB ZEP HAG ZEC MAL
+MAT MRK LUK JHN ACT ROM 1CO 2CO GAL EPH PHP COL 1TH 2TH 1TI 2TI TIT PHM HEB JAS
+1PE 2PE 1JN 2JN 3JN JUD REV
+TOB JDT ESG WIS SIR BAR LJE S3Y SUS BEL 1MA 2MA 3MA 4MA 1ES 2ES MAN PS2 ODA PSS
+EZA 5EZ 6EZ DAG PS3 2BA LBA JUB ENO 1MQ 2MQ 3MQ REP 4BA LAO
+BAK OTH CNC GLO TDX NDX XXA XXB XXC XXD XXE XXF XXG
+""".split()
+
+BOOK_INDEX = {code: index for index, code in enumerate(BOOK_ORDER)}
+
+
+def get_book_code(usx_elem):
+    """Return the book code from a USX document's book element, or ""."""
+    book = usx_elem.find("book")
+    if book is None:
+        return ""
+    return book.get("code", "").upper()
+
+
+def get_book_sort_key(book_code):
+    """Sort key putting books in canonical order and unknown codes last."""
+    return (BOOK_INDEX.get(book_code, len(BOOK_ORDER)), book_code)
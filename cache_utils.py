@@ -0,0 +1,96 @@
+import glob
+import itertools
+import os
+from contextlib import contextmanager
+
+# Tells apart the temporary files of writes running at once in one process
+TEMP_FILE_IDS = itertools.count()
+
+
+def get_cache_dir(*parts):
+    """
+    Return the usfm2pdf cache directory (or a subdirectory of it).
+
+    Honours USFM2PDF_CACHE_DIR, then XDG_CACHE_HOME, then ~/.cache.
+    """
+    root = os.environ.get("USFM2PDF_CACHE_DIR")
+    if not root:
+        xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        root = os.path.join(xdg_cache, "usfm2pdf")
+    return os.path.join(root, *parts)
+
+
+def get_temp_path(path):
+    """
+    Return a new temporary path to write path to.
+
+    The name holds this process's pid, so remove_temp_files can find what a
+    killed process left behind, and a number unique within the process, so
+    threads writing the same path at once never share a temporary file.
+    """
+    return f"{path}.{os.getpid()}.{next(TEMP_FILE_IDS)}.tmp"
+
+
+def remove_temp_files(path, pid):
+    """Remove the temporary files process pid left behind while writing path."""
+    for temp_path in glob.glob(glob.escape(f"{path}.{pid}.") + "*.tmp"):
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    Yield a temporary path next to path, and move it into place on success.
+
+    The rename is atomic, so readers, concurrent runs and interrupted runs
+    never see a partially written file at path. On error the temporary file
+    is removed and path is left untouched.
+    """
+    temp_path = get_temp_path(path)
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
+def write_file_atomic(path, data):
+    """Write bytes to path via a temporary file so readers never see partial data."""
+    with atomic_output(path) as temp_path:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+
+
+def prune_cache_dir(cache_dir, max_bytes):
+    """
+    Delete least recently used files until cache_dir holds at most max_bytes.
+
+    Recency is the file modification time, which readers refresh on each hit.
+    """
+    entries = []
+    try:
+        scan = list(os.scandir(cache_dir))
+    except FileNotFoundError:
+        return
+    for entry in scan:
+        try:
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            # Removed by another process pruning the same directory
+            continue
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
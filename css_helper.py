@@ -27,6 +27,11 @@ body {
     column-rule: 1px solid oklch(0.929 0.013 255.508);
 }
 
+/* In a multi-book volume, start each book on a new page */
+.bible-content + .bible-content {
+    break-before: page;
+}
+
 /* Ensure these elements don't break across columns */
 .book-title, .introductory-material {
     column-span: all;      /* Make headings span across all columns */
@@ -115,7 +120,21 @@ p {
 """
 
 
-def get_edge_css(header=""):
+def get_edge_css(header="", page_furniture=True):
+    if not page_furniture:
+        # Page geometry only, without the running header, page numbers or side
+        # notice, which are overlaid afterwards (see sharding.py)
+        return """
+    @page {
+        size: letter;
+        margin: 1in;
+    }
+
+    .side-notice {
+        display: none;
+    }
+    """
+
     header_css = ""
     if header:
         escaped_header = header.replace("'", "\\'").replace('"', '\\"')
@@ -167,8 +186,8 @@ def get_edge_css(header=""):
     """
 
 
-def generate_css(header=""):
+def generate_css(header="", page_furniture=True):
     """Generate CSS for styling the HTML content."""
     # Prepare header CSS based on whether a header was provided
 
-    return get_edge_css(header) + main_css
+    return get_edge_css(header, page_furniture) + main_css
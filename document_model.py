@@ -0,0 +1,486 @@
+import hashlib
+import json
+import re
+import struct
+from array import array
+from itertools import groupby
+from operator import attrgetter
+from books import get_book_code
+
+# Bump whenever the layout below changes, so stale cache entries are ignored
+FORMAT_VERSION = 2
+
+# Inline content is a flat array of (code, start, end) triples. The low bits
+# of code are the operation; the rest is a style code where one applies.
+# start and end are offsets into the book's text buffer.
+TEXT = 0  # A run of text
+VERSE = 1  # A verse number (the text range holds the number)
+CHAR = 2  # A character style run without nested styles, e.g. \nd ...\nd*
+CHAR_OPEN = 3  # Start of a character style with nested styles
+CHAR_CLOSE = 4  # End of a character style with nested styles
+OP_BITS = 3
+OP_MASK = (1 << OP_BITS) - 1
+OP_SIZE = 3
+
+# Style code of the paragraph record holding the book title
+TITLE = -1
+
+HEADER = struct.Struct("<4sIIIII")
+MAGIC = b"UBK1"
+
+
+def get_chapter_number(chapter):
+    # Chapter numbers may carry a suffix, e.g. "3a"
+    match = re.match(r"\d+", chapter)
+    return int(match.group()) if match else 0
+
+
+class Paragraph:
+    """
+    One paragraph (or the book title) of a Book.
+
+    style is a code into Book.styles, or TITLE; chapter is an index into
+    Book.chapters, or -1 before the first chapter; start and end delimit the
+    paragraph's inline content in Book.ops.
+    """
+
+    __slots__ = ("style", "chapter", "start", "end")
+
+    def __init__(self, style, chapter, start, end):
+        self.style = style
+        self.chapter = chapter
+        self.start = start
+        self.end = end
+
+
+class Book:
+    """
+    Compact model of a book, between the USX tree and the output formats.
+
+    All text is held in one string and all inline content in one array of
+    ints, shared by every paragraph; styles and chapter numbers are stored
+    once and referred to by index. Selections of chapters share the buffers
+    of the book they were taken from, and with them the chapter digests
+    already computed by hash_chapter.
+    """
+
+    __slots__ = (
+        "code",
+        "text",
+        "styles",
+        "chapters",
+        "ops",
+        "paragraphs",
+        "chapter_hashes",
+    )
+
+    def __init__(
+        self, code, text, styles, chapters, ops, paragraphs, chapter_hashes=None
+    ):
+        self.code = code
+        self.text = text
+        self.styles = styles
+        self.chapters = chapters
+        self.ops = ops
+        self.paragraphs = paragraphs
+        # Digests by (first op, last op, paragraph count), as positions in the
+        # buffers identify a run of paragraphs for every book sharing them
+        self.chapter_hashes = {} if chapter_hashes is None else chapter_hashes
+
+    def iter_ops(self, paragraph):
+        """Yield (operation, style code, text) for a paragraph's inline content."""
+        text, ops = self.text, self.ops
+        for i in range(paragraph.start, paragraph.end, OP_SIZE):
+            code = ops[i]
+            yield code & OP_MASK, code >> OP_BITS, text[ops[i + 1] : ops[i + 2]]
+
+    def get_chapter_count(self):
+        return len({paragraph.chapter for paragraph in self.paragraphs} - {-1})
+
+    def count_verses(self, paragraph=None):
+        """Count the numbered verses in one paragraph, or in the whole book."""
+        if paragraph is None:
+            return sum(self.count_verses(paragraph) for paragraph in self.paragraphs)
+        ops = self.ops
+        return sum(
+            1
+            for i in range(paragraph.start, paragraph.end, OP_SIZE)
+            if ops[i] & OP_MASK == VERSE
+        )
+
+    def iter_chapters(self):
+        """
+        Yield the paragraphs of each chapter, as lists in document order.
+
+        Paragraphs before the first chapter (the title and introduction) come
+        first, as a chapter of their own.
+        """
+        for _, paragraphs in groupby(self.paragraphs, attrgetter("chapter")):
+            yield list(paragraphs)
+
+    def hash_chapter(self, paragraphs):
+        """
+        Return a digest of the content of one chapter's paragraphs.
+
+        The digest covers the text, inline content, style names and chapter
+        number, but not where the chapter sits in the book, so the same
+        chapter has the same digest in every edition or book it appears in.
+        Digests are computed once per chapter and serialized with the book.
+
+        Args:
+            paragraphs: The paragraphs of one chapter, as from iter_chapters
+        """
+        key = (paragraphs[0].start, paragraphs[-1].end, len(paragraphs))
+        content_hash = self.chapter_hashes.get(key)
+        if content_hash is None:
+            content_hash = self.chapter_hashes[key] = self.compute_chapter_hash(
+                paragraphs
+            )
+        return content_hash
+
+    def compute_chapter_hash(self, paragraphs):
+        text, ops, styles = self.text, self.ops, self.styles
+        chapter = paragraphs[0].chapter
+        paragraph_styles = array("i", [paragraph.style for paragraph in paragraphs])
+        paragraph_sizes = array(
+            "i", [paragraph.end - paragraph.start for paragraph in paragraphs]
+        )
+
+        # Paragraphs are in document order, so unless some were left out of a
+        # selection, their content is one run of the buffers
+        if paragraphs[-1].end - paragraphs[0].start == sum(paragraph_sizes):
+            runs = [(paragraphs[0].start, paragraphs[-1].end)]
+        else:
+            runs = [(paragraph.start, paragraph.end) for paragraph in paragraphs]
+
+        digest = hashlib.sha256()
+        style_codes = set(paragraph_styles)
+        for start, end in runs:
+            if start == end:
+                continue
+            codes = ops[start:end:OP_SIZE]
+            # Offsets move with everything before the run, so hash where each
+            # operation's text ends relative to the start of the run instead
+            text_start = ops[start + 1]
+            text_ends = array(
+                "i",
+                [
+                    text_end - text_start
+                    for text_end in ops[start + 2 : end : OP_SIZE].tolist()
+                ],
+            )
+            style_codes.update(code >> OP_BITS for code in set(codes))
+            digest.update(codes.tobytes())
+            digest.update(text_ends.tobytes())
+            digest.update(text[text_start : ops[end - 1]].encode("utf-8"))
+        digest.update(paragraph_styles.tobytes())
+        digest.update(paragraph_sizes.tobytes())
+
+        # Style codes differ from book to book, so include the names they stand
+        # for; text and verse operations carry code 0 whether or not it's in use
+        used_styles = [
+            f"{code}={styles[code]}"
+            for code in sorted(style_codes)
+            if 0 <= code < len(styles)
+        ]
+        chapter_number = self.chapters[chapter] if chapter >= 0 else ""
+        digest.update("\0".join([chapter_number, *used_styles]).encode("utf-8"))
+        return digest.hexdigest()
+
+    def with_paragraphs(self, paragraphs):
+        return Book(
+            self.code,
+            self.text,
+            self.styles,
+            self.chapters,
+            self.ops,
+            paragraphs,
+            self.chapter_hashes,
+        )
+
+    def select_chapters(self, first, last):
+        """
+        Return a selection of chapters first to last, sharing this book's buffers.
+
+        The book title is always kept, so it still heads the selection; the
+        introduction before chapter 1 is kept only when first is 1.
+        """
+        chapter_numbers = [get_chapter_number(chapter) for chapter in self.chapters]
+        return self.with_paragraphs(
+            [
+                paragraph
+                for paragraph in self.paragraphs
+                if paragraph.style == TITLE
+                or first
+                <= max(
+                    chapter_numbers[paragraph.chapter] if paragraph.chapter >= 0 else 0,
+                    1,
+                )
+                <= last
+            ]
+        )
+
+    def select_first_chapters(self, count):
+        """
+        Return a selection of the first count chapters, sharing this book's buffers.
+
+        Chapters are counted in document order whatever their numbers, so this
+        works for passages too; the title and introduction are kept.
+        """
+        chapters = set()
+        for position, paragraph in enumerate(self.paragraphs):
+            if paragraph.chapter >= 0 and paragraph.chapter not in chapters:
+                if len(chapters) == count:
+                    return self.with_paragraphs(self.paragraphs[:position])
+                chapters.add(paragraph.chapter)
+        return self
+
+    def split(self, max_verses):
+        """
+        Split the book into selections of roughly max_verses verses.
+
+        Selections are cut only at chapter boundaries, so that each one starts
+        with its chapter number and keeps whole paragraphs together; the book
+        title and introduction stay in the first selection.
+        """
+        shards = [[]]
+        verse_count = 0
+        chapter = -1
+        for paragraph in self.paragraphs:
+            if paragraph.chapter != chapter:
+                chapter = paragraph.chapter
+                if verse_count >= max_verses:
+                    shards.append([])
+                    verse_count = 0
+            shards[-1].append(paragraph)
+            verse_count += self.count_verses(paragraph)
+        return [self.with_paragraphs(paragraphs) for paragraphs in shards]
+
+    def compact(self):
+        """Return a copy holding only the text and content of its own paragraphs."""
+        text, ops = self.text, self.ops
+        pieces = []
+        new_ops = array("i")
+        paragraphs = []
+        offset = 0
+        for paragraph in self.paragraphs:
+            start = len(new_ops)
+            # A paragraph's text is contiguous in the buffer, in document order,
+            # and every operation (even a zero-width open or close) holds real
+            # offsets into it, which compute_chapter_hash relies on
+            if paragraph.start < paragraph.end:
+                text_start = ops[paragraph.start + 1]
+                text_end = ops[paragraph.end - 1]
+            else:
+                text_start = text_end = 0
+            pieces.append(text[text_start:text_end])
+            shift = offset - text_start
+            for i in range(paragraph.start, paragraph.end, OP_SIZE):
+                new_ops.extend((ops[i], ops[i + 1] + shift, ops[i + 2] + shift))
+            offset += text_end - text_start
+            paragraphs.append(
+                Paragraph(paragraph.style, paragraph.chapter, start, len(new_ops))
+            )
+        return Book(
+            self.code, "".join(pieces), self.styles, self.chapters, new_ops, paragraphs
+        )
+
+    def to_bytes(self):
+        """
+        Serialize the book, e.g. for the parse cache or another process.
+
+        Selections are serialized with the whole of the buffers they share;
+        compact() them first to keep only their own content.
+        """
+        metadata = json.dumps(
+            {
+                "code": self.code,
+                "styles": self.styles,
+                "chapters": self.chapters,
+                "chapter_hashes": [
+                    [*key, content_hash]
+                    for key, content_hash in self.chapter_hashes.items()
+                ],
+            }
+        ).encode("utf-8")
+        text = self.text.encode("utf-8")
+        table = array("i")
+        for paragraph in self.paragraphs:
+            table.extend(
+                (paragraph.style, paragraph.chapter, paragraph.start, paragraph.end)
+            )
+        ops = self.ops.tobytes()
+        table = table.tobytes()
+        header = HEADER.pack(
+            MAGIC, FORMAT_VERSION, len(metadata), len(text), len(table), len(ops)
+        )
+        return b"".join([header, metadata, text, table, ops])
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Load a book serialized by to_bytes.
+
+        Raises:
+            ValueError: If data is not a serialized book of this format version
+        """
+        try:
+            magic, version, *lengths = HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError("not a serialized book") from None
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not a serialized book of this format version")
+
+        view = memoryview(data)[HEADER.size :]
+        blobs = []
+        for length in lengths:
+            blobs.append(view[:length])
+            view = view[length:]
+        metadata_blob, text_blob, table_blob, ops_blob = blobs
+        if len(view) or len(table_blob) % (4 * array("i").itemsize):
+            raise ValueError("truncated or corrupt serialized book")
+
+        metadata = json.loads(bytes(metadata_blob))
+        table = array("i")
+        table.frombytes(table_blob)
+        ops = array("i")
+        ops.frombytes(ops_blob)
+        paragraphs = [
+            Paragraph(*table[i : i + 4]) for i in range(0, len(table), 4)
+        ]
+        return cls(
+            metadata["code"],
+            str(text_blob, "utf-8"),
+            metadata["styles"],
+            metadata["chapters"],
+            ops,
+            paragraphs,
+            {
+                (start, end, count): content_hash
+                for start, end, count, content_hash in metadata["chapter_hashes"]
+            },
+        )
+
+
+class BookBuilder:
+    """Accumulate the buffers of a Book while walking a USX tree."""
+
+    def __init__(self):
+        self.pieces = []
+        self.length = 0
+        self.styles = {}
+        self.chapters = []
+        self.ops = array("i")
+        self.paragraphs = []
+
+    def get_style(self, name):
+        style = self.styles.get(name)
+        if style is None:
+            style = self.styles[name] = len(self.styles)
+        return style
+
+    def add_paragraph(self, style, elem):
+        start = len(self.ops)
+        if style == TITLE:
+            self.add_op(TEXT, 0, elem.text or elem.get("code", ""))
+        else:
+            add_inline_content(elem, self)
+        self.paragraphs.append(
+            Paragraph(style, len(self.chapters) - 1, start, len(self.ops))
+        )
+
+    def add_op(self, operation, style, text):
+        start = self.length
+        if text:
+            self.pieces.append(text)
+            self.length += len(text)
+        self.ops.extend((operation | style << OP_BITS, start, self.length))
+
+    def build(self, code):
+        return Book(
+            code,
+            "".join(self.pieces),
+            list(self.styles),
+            self.chapters,
+            self.ops,
+            self.paragraphs,
+        )
+
+
+def add_structure(elem, builder):
+    for child in elem:
+        tag = child.tag
+        if tag == "para":
+            builder.add_paragraph(builder.get_style(child.get("style", "p")), child)
+        elif tag == "chapter":
+            number = child.get("number", "")
+            if number:
+                builder.chapters.append(number)
+        elif tag == "book":
+            builder.add_paragraph(TITLE, child)
+        else:
+            # Structural elements such as sidebars may hold paragraphs of their own
+            add_structure(child, builder)
+
+
+def add_inline_content(elem, builder):
+    if elem.text:
+        builder.add_op(TEXT, 0, elem.text)
+
+    for child in elem:
+        tag = child.tag
+        if tag == "verse":
+            add_verse(child, builder)
+        elif tag == "char":
+            add_char(child, builder)
+        else:
+            # Notes and other inline elements contribute their own text only;
+            # footnote and cross-reference content is omitted
+            builder.add_op(TEXT, 0, child.text)
+
+        tail = child.tail
+        if tail:
+            builder.add_op(TEXT, 0, tail)
+
+
+def add_verse(elem, builder):
+    number = elem.get("number")
+    if not number:
+        # Verse end milestones
+        builder.add_op(TEXT, 0, elem.text)
+        return
+
+    builder.add_op(VERSE, 0, number)
+    if elem.text:
+        builder.add_op(TEXT, 0, elem.text)
+
+
+def add_char(elem, builder):
+    style = builder.get_style(elem.get("style", ""))
+    if len(elem) == 0:
+        # The common case: a run of plain text
+        builder.add_op(CHAR, style, elem.text)
+        return
+
+    # Nested character styles, e.g. \add ... \+nd ...\+nd* ...\add*
+    builder.add_op(CHAR_OPEN, style, None)
+    add_inline_content(elem, builder)
+    builder.add_op(CHAR_CLOSE, style, None)
+
+
+def build_book(usx_elem):
+    """Build the compact model of a book from its USX element."""
+    builder = BookBuilder()
+    add_structure(usx_elem, builder)
+    book = builder.build(get_book_code(usx_elem))
+    # Hash the chapters up front, so the digests are cached with the book
+    for paragraphs in book.iter_chapters():
+        book.hash_chapter(paragraphs)
+    return book
+
+
+def as_book(document):
+    """Return document as a Book, building one if it is a USX element."""
+    if isinstance(document, Book):
+        return document
+    return build_book(document)
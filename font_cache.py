@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import os
+import re
+from pathlib import Path
+from urllib.parse import urljoin
+from cache_utils import get_cache_dir, write_file_atomic
+
+DEFAULT_NOTO_URL = "https://fonts.googleapis.com/css2?family=Noto+Serif:ital,wght@0,100..900;1,100..900&display=swap"
+
+FONT_CSS_NAME = "fonts.css"
+FONT_EXTENSIONS = {
+    ".ttf": "truetype",
+    ".otf": "opentype",
+    ".woff": "woff",
+    ".woff2": "woff2",
+}
+FONT_WEIGHTS = {
+    "thin": 100,
+    "extralight": 200,
+    "light": 300,
+    "regular": 400,
+    "medium": 500,
+    "semibold": 600,
+    "bold": 700,
+    "extrabold": 800,
+    "black": 900,
+}
+
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def get_font_cache_dir(font_url, font_dir=None):
+    """Return the directory holding the cached CSS and font files for font_url."""
+    root = font_dir or get_cache_dir("fonts")
+    url_hash = hashlib.sha256(font_url.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(root, url_hash)
+
+
+def fetch_url(url):
+    # Imported here so that the CLI, which only needs DEFAULT_NOTO_URL from
+    # this module until something is rendered, starts without http.client
+    import urllib.request
+
+    # Google Fonts serves plain TrueType files to non-browser user agents such as
+    # urllib's default, which is exactly what we want to cache.
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read()
+
+
+def warm_font_cache(font_url, font_dir=None):
+    """
+    Download the font CSS and every font file it references into the cache.
+
+    The cached CSS is rewritten so its @font-face rules point at the local
+    copies, which makes later renders work without network access.
+
+    Returns:
+        Path to the cached CSS file
+    """
+    cache_dir = get_font_cache_dir(font_url, font_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    css = fetch_url(font_url).decode("utf-8")
+
+    def localize(match):
+        source_url = urljoin(font_url, match.group(2))
+        extension = os.path.splitext(source_url.split("?")[0])[1] or ".font"
+        file_name = hashlib.sha256(source_url.encode("utf-8")).hexdigest()[:16]
+        file_name += extension
+        file_path = os.path.join(cache_dir, file_name)
+        if not os.path.exists(file_path):
+            write_file_atomic(file_path, fetch_url(source_url))
+        # Relative URLs are resolved against the cached CSS file's location
+        return f'url("{file_name}")'
+
+    local_css = CSS_URL_PATTERN.sub(localize, css)
+    css_path = os.path.join(cache_dir, FONT_CSS_NAME)
+    write_file_atomic(css_path, local_css.encode("utf-8"))
+    return css_path
+
+
+def describe_font_file(file_name):
+    """
+    Guess the @font-face family, weight and style from a font file name.
+
+    Follows the Noto naming scheme, e.g. NotoSerif-BoldItalic.ttf or
+    NotoSerif-Italic[wdth,wght].ttf for variable fonts.
+    """
+    stem = os.path.splitext(file_name)[0]
+    is_variable = "[" in stem
+    stem = re.sub(r"\[.*\]", "", stem)
+    family_part, _, style_part = stem.partition("-")
+    family = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", " ", family_part)
+
+    style_part = style_part.lower()
+    font_style = "italic" if "italic" in style_part else "normal"
+    weight_name = style_part.replace("italic", "") or "regular"
+    if is_variable:
+        font_weight = "100 900"
+    else:
+        font_weight = str(FONT_WEIGHTS.get(weight_name, 400))
+    return family, font_weight, font_style
+
+
+def generate_font_face_css(font_dir):
+    """Generate @font-face rules for pre-provisioned font files in font_dir."""
+    rules = []
+    for file_name in sorted(os.listdir(font_dir)):
+        extension = os.path.splitext(file_name)[1].lower()
+        if extension not in FONT_EXTENSIONS:
+            continue
+        family, font_weight, font_style = describe_font_file(file_name)
+        font_uri = Path(font_dir, file_name).resolve().as_uri()
+        rules.append(
+            f"""@font-face {{
+    font-family: "{family}";
+    font-weight: {font_weight};
+    font-style: {font_style};
+    src: url("{font_uri}") format("{FONT_EXTENSIONS[extension]}");
+}}"""
+        )
+    return "\n".join(rules)
+
+
+def has_font_files(font_dir):
+    return os.path.isdir(font_dir) and any(
+        os.path.splitext(file_name)[1].lower() in FONT_EXTENSIONS
+        for file_name in os.listdir(font_dir)
+    )
+
+
+def get_font_stylesheet(font_url=None, font_dir=None):
+    """
+    Resolve the font stylesheet for a render, preferring local sources.
+
+    In order: font files provisioned directly in font_dir, a warmed cache
+    entry for font_url, a fresh download into the cache, and finally the
+    remote font_url itself if the download fails.
+
+    Returns:
+        Keyword arguments for weasyprint.CSS
+    """
+    font_url = font_url or DEFAULT_NOTO_URL
+    if font_dir and has_font_files(font_dir):
+        return {"string": generate_font_face_css(font_dir)}
+
+    css_path = os.path.join(get_font_cache_dir(font_url, font_dir), FONT_CSS_NAME)
+    if os.path.exists(css_path):
+        return {"filename": css_path}
+
+    try:
+        return {"filename": warm_font_cache(font_url, font_dir)}
+    except OSError as e:
+        print(f"Could not cache fonts from {font_url}: {e}")
+        return {"url": font_url}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Download fonts into the local cache for offline rendering"
+    )
+    parser.add_argument(
+        "--noto-url",
+        help="Custom Noto font URL (Google Fonts) to support specific script",
+        default=DEFAULT_NOTO_URL,
+    )
+    parser.add_argument(
+        "--font-dir",
+        help="Font cache directory (default: the usfm2pdf user cache)",
+        default=None,
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    css_path = warm_font_cache(args.noto_url, args.font_dir)
+    print(f"Fonts cached: {os.path.dirname(css_path)}")
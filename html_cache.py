@@ -0,0 +1,61 @@
+import hashlib
+import os
+from cache_utils import get_cache_dir, prune_cache_dir, write_file_atomic
+from html_generator import GENERATOR_VERSION
+from version import __version__
+
+DEFAULT_MAX_CACHE_BYTES = 128 * 1024 * 1024
+
+
+class HtmlCache:
+    """
+    On-disk cache of the HTML generated for each chapter, by content.
+
+    Entries are keyed by a digest of the chapter's content (see
+    Book.hash_chapter) and the generator version, so a chapter is only
+    generated once however many editions, headers or drafts it appears in.
+    Reading an entry refreshes its mtime, and the least recently used
+    entries are evicted once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir or get_cache_dir("html")
+        self.max_bytes = max_bytes
+        self.version = f"{__version__}\0{GENERATOR_VERSION}"
+        self.has_new_entries = False
+
+    def get_path(self, content_hash):
+        key = hashlib.sha256(f"{self.version}\0{content_hash}".encode("utf-8"))
+        return os.path.join(self.cache_dir, key.hexdigest() + ".html")
+
+    def get(self, content_hash):
+        """Return the cached HTML for content_hash, or None on a miss."""
+        path = self.get_path(content_hash)
+        try:
+            with open(path, "rb") as f:
+                html = f.read().decode("utf-8")
+            os.utime(path)
+        except (OSError, UnicodeDecodeError):
+            return None
+        return html
+
+    def put(self, content_hash, html):
+        """Store the HTML for content_hash; call prune() once done adding entries."""
+        try:
+            if not self.has_new_entries:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self.has_new_entries = True
+            write_file_atomic(self.get_path(content_hash), html.encode("utf-8"))
+        except OSError:
+            # The cache is only a shortcut: a chapter that can't be stored (e.g.
+            # on a full disk) is generated again next time
+            pass
+
+    def prune(self):
+        """Evict the least recently used entries if anything was added."""
+        if self.has_new_entries:
+            self.has_new_entries = False
+            try:
+                prune_cache_dir(self.cache_dir, self.max_bytes)
+            except OSError:
+                pass
@@ -0,0 +1,303 @@
+from html import escape
+from document_model import (
+    CHAR,
+    CHAR_OPEN,
+    OP_BITS,
+    OP_MASK,
+    OP_SIZE,
+    TEXT,
+    TITLE,
+    VERSE,
+    as_book,
+)
+
+# Bump whenever the HTML generated for the same content changes, so that
+# chapters cached by html_cache are generated again
+GENERATOR_VERSION = 1
+
+SIDE_NOTICE = '<div class="side-notice">FOR REVIEW - NOTE: This document does not reflect all USFM content. Footnotes and other elements are omitted.</div>'
+
+HTML_HEAD = [
+    "<!DOCTYPE html>",
+    "<html>",
+    "<head>",
+    '<meta charset="UTF-8">',
+    "<title>Bible Text</title>",
+    "</head>",
+    "<body>",
+    SIDE_NOTICE,
+]
+
+BOOK_HEAD = [
+    '<div class="bible-content">',
+]
+
+BOOK_TAIL = [
+    # Add side note
+    '<div class="side-note">DRAFT: This PDF does not reflect all USFM content. Footnotes and other elements are omitted.</div>',
+    "</div>",  # Close bible-content
+]
+
+HTML_TAIL = [
+    # Close HTML structure
+    "</body>",
+    "</html>",
+]
+
+# Paragraph classes by USX para style; other styles are plain paragraphs,
+# or introductory material before the first chapter
+PARA_CLASSES = {
+    "s": "section-heading",
+    "s1": "section-heading",
+    "s2": "section-heading",
+    "q1": "poetry-q1",
+    "q2": "poetry-q2",
+}
+
+# Paragraph classes that never carry the chapter number
+NO_CHAPTER_NUMBER_CLASSES = {"introductory-material", "section-heading"}
+
+# Character styles rendered as styled spans; others render as plain text
+CHAR_CLASSES = {
+    "nd": "divine-name",
+}
+
+
+class FragmentCache(dict):
+    """
+    Markup fragments by value, built once and reused.
+
+    Given values, only their fragments are prebuilt and kept, and any other
+    value's fragment is built each time it is used, so values taken from the
+    input (such as verse "3a") can't grow the table without bound. Otherwise
+    fragments are kept as they are first used, for values from a fixed set.
+    """
+
+    def __init__(self, build, values=None):
+        super().__init__((value, build(value)) for value in values or ())
+        self.build = build
+        self.is_fixed = values is not None
+
+    def __missing__(self, value):
+        fragment = self.build(value)
+        if not self.is_fixed:
+            self[value] = fragment
+        return fragment
+
+
+# Verse and chapter number spans, prebuilt for the numbers found in practice;
+# verse 1 has no number span, as the chapter number stands in for it
+VERSE_NUMBER_SPANS = FragmentCache(
+    lambda number: f'<span class="verse-number">{escape(number)}</span>',
+    [str(number) for number in range(2, 177)],
+)
+CHAPTER_NUMBER_SPANS = FragmentCache(
+    lambda number: f'<span class="chapter-number">{escape(number)}</span>',
+    [str(number) for number in range(1, 151)],
+)
+PARA_OPEN_TAGS = FragmentCache(lambda para_class: f'<p class="{para_class}">')
+SUPPRESSED_INDENT_OPEN_TAGS = FragmentCache(
+    lambda para_class: f'<p class="{para_class} suppress-indent">'
+)
+
+
+class HtmlState:
+    """Output fragments plus the chapter bookkeeping carried between paragraphs."""
+
+    def __init__(self, book):
+        self.book = book
+        self.html = []
+        self.chapter = -1
+        self.has_printed_current_chapter = False
+        # Per style code: paragraph class, character class
+        self.para_classes = [PARA_CLASSES.get(style) for style in book.styles]
+        self.char_classes = [CHAR_CLASSES.get(style) for style in book.styles]
+
+    @property
+    def current_chapter(self):
+        return self.book.chapters[self.chapter] if self.chapter >= 0 else ""
+
+
+def handle_book_title(paragraph, state):
+    text, ops = state.book.text, state.book.ops
+    book_title = text[ops[paragraph.start + 1] : ops[paragraph.start + 2]]
+    state.html.append(f'<h1 class="book-title">{escape(book_title)}</h1>')
+
+
+def handle_blank_line(paragraph, state):
+    state.html.append('<div class="blank-line"></div>')
+
+
+def handle_para(paragraph, state):
+    if paragraph.style == TITLE:
+        handle_book_title(paragraph, state)
+        return
+
+    style_handler = PARA_STYLE_HANDLERS.get(state.book.styles[paragraph.style])
+    if style_handler is not None:
+        style_handler(paragraph, state)
+        return
+
+    if paragraph.chapter != state.chapter:
+        state.chapter = paragraph.chapter
+        state.has_printed_current_chapter = False
+
+    para_class = state.para_classes[paragraph.style]
+    if para_class is None:
+        if paragraph.chapter < 0:
+            para_class = "introductory-material"
+        else:
+            para_class = "paragraph"
+
+    html = state.html
+    if (
+        para_class not in NO_CHAPTER_NUMBER_CLASSES
+        and not state.has_printed_current_chapter
+    ):
+        # We are going to add the chapter number to the first paragraph of the chapter
+        # so we need to suppress the indent
+        html.append(SUPPRESSED_INDENT_OPEN_TAGS[para_class])
+        html.append(CHAPTER_NUMBER_SPANS[state.current_chapter])
+        state.has_printed_current_chapter = True
+    else:
+        html.append(PARA_OPEN_TAGS[para_class])
+
+    append_inline_content(paragraph, state)
+    html.append("</p>")
+
+
+def append_inline_content(paragraph, state):
+    """Append the text, verse numbers and character styles of a paragraph."""
+    html = state.html
+    append = html.append
+    char_classes = state.char_classes
+    text, ops = state.book.text, state.book.ops
+    for i in range(paragraph.start, paragraph.end, OP_SIZE):
+        code = ops[i]
+        operation = code & OP_MASK
+        if operation == TEXT:
+            append(escape(text[ops[i + 1] : ops[i + 2]]))
+        elif operation == VERSE:
+            # Verse 1 has no number: the chapter number stands in for it
+            verse_num = text[ops[i + 1] : ops[i + 2]]
+            if verse_num != "1":
+                append(VERSE_NUMBER_SPANS[verse_num])
+        elif operation == CHAR:
+            char_class = char_classes[code >> OP_BITS]
+            run = escape(text[ops[i + 1] : ops[i + 2]])
+            if char_class is None:
+                append(run)
+            else:
+                append(f'<span class="{char_class}">{run}</span>')
+        else:
+            # Nested character styles, e.g. \add ... \+nd ...\+nd* ...\add*
+            char_class = char_classes[code >> OP_BITS]
+            if char_class is not None:
+                append(
+                    f'<span class="{char_class}">'
+                    if operation == CHAR_OPEN
+                    else "</span>"
+                )
+
+
+# Para styles that bypass normal paragraph rendering
+PARA_STYLE_HANDLERS = {
+    "b": handle_blank_line,
+}
+
+
+def iter_book_html(book, html_cache=None):
+    """
+    Generate the bible-content section for one book as a stream of chunks.
+
+    book is a document_model.Book, or a USX element to build one from.
+    Chunks are yielded after each paragraph, so only one paragraph's worth of
+    fragments is held at a time; with an html_cache.HtmlCache, after each
+    chapter, reusing the HTML of chapters generated before. Every chunk starts
+    with a newline, ready to follow the document head.
+    """
+    state = HtmlState(as_book(book))
+    yield "\n" + "\n".join(BOOK_HEAD)
+
+    if html_cache is None:
+        html = state.html
+        for paragraph in state.book.paragraphs:
+            handle_para(paragraph, state)
+            yield "\n" + "\n".join(html)
+            html.clear()
+    else:
+        yield from iter_cached_chapters_html(state, html_cache)
+
+    yield "\n" + "\n".join(BOOK_TAIL)
+
+
+def iter_cached_chapters_html(state, html_cache):
+    """
+    Generate the HTML of each chapter, or take it from html_cache.
+
+    A chapter's HTML depends only on its own content: the chapter number
+    bookkeeping in state starts afresh with each chapter.
+    """
+    book, html = state.book, state.html
+    for paragraphs in book.iter_chapters():
+        content_hash = book.hash_chapter(paragraphs)
+        chunk = html_cache.get(content_hash)
+        if chunk is None:
+            for paragraph in paragraphs:
+                handle_para(paragraph, state)
+            chunk = "\n" + "\n".join(html)
+            html.clear()
+            html_cache.put(content_hash, chunk)
+        yield chunk
+    html_cache.prune()
+
+
+def iter_html_from_usx(usx_elem, html_cache=None):
+    """
+    Generate HTML content from a book as a stream of chunks.
+
+    usx_elem is a document_model.Book, or a USX element to build one from.
+    Joining the chunks with "" gives exactly generate_html_from_usx's output.
+    """
+    yield "\n".join(HTML_HEAD)
+    yield from iter_book_html(usx_elem, html_cache)
+    yield "\n" + "\n".join(HTML_TAIL)
+
+
+def iter_volume_html(usx_elems, html_cache=None):
+    """Generate one HTML document holding several books, in the order given."""
+    yield "\n".join(HTML_HEAD)
+    for usx_elem in usx_elems:
+        yield from iter_book_html(usx_elem, html_cache)
+    yield "\n" + "\n".join(HTML_TAIL)
+
+
+def iter_standalone_html(usx_elem, css, font_url=None, html_cache=None):
+    """
+    Generate a self-contained HTML page for reading in a browser.
+
+    The stylesheet is embedded in the page; font_url, if given, is linked so
+    that browsers load the web font, falling back to a local serif font.
+    """
+    head_end = HTML_HEAD.index("</head>")
+    styles = [f"<style>\n{css}\n</style>"]
+    if font_url:
+        styles.insert(0, f'<link rel="stylesheet" href="{escape(font_url)}">')
+    yield "\n".join(HTML_HEAD[:head_end] + styles + HTML_HEAD[head_end:])
+    yield from iter_book_html(usx_elem, html_cache)
+    yield "\n" + "\n".join(HTML_TAIL)
+
+
+def write_html_from_usx(usx_elem, file_obj, html_cache=None):
+    """Stream the HTML for a book to a writable text file object."""
+    for chunk in iter_html_from_usx(usx_elem, html_cache):
+        file_obj.write(chunk)
+
+
+def generate_html_from_usx(usx_elem, html_cache=None):
+    """
+    Generate HTML content from a book (a document_model.Book or USX element).
+
+    With an html_cache.HtmlCache, chapters generated before are reused.
+    """
+    return "".join(iter_html_from_usx(usx_elem, html_cache))
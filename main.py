@@ -1,11 +1,47 @@
 import argparse
+import cProfile
 import glob
+import multiprocessing
 import os
-from usfm_grammar import USFMParser
-from pdf_generator import usx_to_pdf
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from books import get_book_sort_key
+from cache_utils import atomic_output, remove_temp_files
+from manifest import BuildManifest, compute_build_hash
+from pdf_optimize import COMPRESSION_CHOICES, get_pdf_options
+from timings import (
+    NO_TIMINGS,
+    StageTimings,
+    append_timings_json,
+    format_timings_table,
+)
+from usfm_index import load_index, parse_verse_range, select_usfm
+from watch import watch_files
+from workers import FAILURE_KINDS, WorkerPool, can_measure_rss
 
+# parse_cache, pdf_generator and sharding load usfm-grammar, WeasyPrint and
+# pypdf, which take far longer to import than a no-op run takes to finish.
+# They are imported by the functions that convert books, so --help and runs
+# where every book is skipped never pay for them.
 
-def parse_arguments():
+
+ON_EXIST_POLICIES = ("ask", "skip", "overwrite", "newer", "fail")
+
+# Output file extension for each --format
+OUTPUT_EXTENSIONS = {"pdf": ".pdf", "html": ".html", "draft": ".draft.pdf"}
+
+# Pages in a --format draft PDF when neither --range nor --pages is given
+DEFAULT_DRAFT_PAGES = 10
+
+
+def verse_range(text):
+    try:
+        return parse_verse_range(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_arguments(argv=None):
     parser = argparse.ArgumentParser(description="Convert USFM file to PDF")
     parser.add_argument(
         "input_pattern", help="Path or glob pattern for input USFM file(s)"
@@ -19,11 +55,25 @@ def parse_arguments():
         "-d", "--output-dir", help="Directory for output files (default: same as input)"
     )
     parser.add_argument("--header", help="Header text to display", default="")
-    # Add argument for no overwrite. If specified, existing files will not be overwritten.
+    parser.add_argument(
+        "--on-exist",
+        help="What to do when an output file already exists: ask, skip, "
+        "overwrite, overwrite only if the input is newer, or fail "
+        "(default: ask on a terminal, fail otherwise)",
+        choices=ON_EXIST_POLICIES,
+        default=None,
+    )
     parser.add_argument(
         "--no-overwrite",
         "-n",
-        help="Do not overwrite existing output files",
+        help="Do not overwrite existing output files (same as --on-exist skip)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--force",
+        "-f",
+        help="Rebuild outputs even if the build manifest says they are up to date",
         action="store_true",
         default=False,
     )
@@ -32,7 +82,181 @@ def parse_arguments():
         help="Custom Noto font URL (Google Fonts) to support specific script",
         default=None,
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--font-dir",
+        help="Directory of pre-provisioned font files, or the font cache to use "
+        "(default: the usfm2pdf user cache; warm it with font_cache.py)",
+        default=None,
+    )
+    parser.add_argument(
+        "--format",
+        help="Output format: pdf, standalone html (no layout, much faster), or "
+        "a quick draft PDF of --range or the first --pages pages (default: pdf)",
+        choices=OUTPUT_EXTENSIONS,
+        default="pdf",
+    )
+    parser.add_argument(
+        "--range",
+        help="Only convert this passage, e.g. 12:1-15:21, 12-15 or 12:3-8 "
+        "(html and draft formats)",
+        type=verse_range,
+        default=None,
+    )
+    parser.add_argument(
+        "--pages",
+        help=f"Only lay out this many pages (draft format; default: "
+        f"{DEFAULT_DRAFT_PAGES} unless --range is given)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--full-fonts",
+        help="Embed complete fonts instead of subsets of the glyphs used",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--hinting",
+        help="Keep hinting instructions in embedded fonts (larger, crisper at "
+        "small sizes on screen)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--compression",
+        help="PDF stream compression: none, default, or max to recompress page "
+        "content at the highest zlib level and merge identical objects "
+        "(default: default)",
+        choices=COMPRESSION_CHOICES,
+        default="default",
+    )
+    parser.add_argument(
+        "--deduplicate",
+        help="Merge identical objects, such as repeated font streams, before "
+        "writing each PDF",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--keep-html",
+        help="Also save the generated HTML next to each output PDF (for debugging)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--no-parse-cache",
+        help="Always parse the USFM instead of reusing books parsed by earlier runs",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--no-html-cache",
+        help="Always generate the HTML of every chapter instead of reusing the HTML "
+        "of identical chapters from earlier runs",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--timings",
+        help="Record wall time and peak memory of each stage per book and print "
+        "a summary table (memory tracing slows rendering down)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--timings-json",
+        help="Append per-book stage timings as JSON lines to this file "
+        "(implies --timings)",
+        default=None,
+    )
+    parser.add_argument(
+        "--profile",
+        help="Directory to write a cProfile .prof file per book into",
+        default=None,
+    )
+    parser.add_argument(
+        "--watch",
+        "-w",
+        help="Keep running and re-render books whenever their input files change",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--debounce",
+        help="Seconds a file must stay unchanged before --watch re-renders it "
+        "(default: 0.5)",
+        type=float,
+        default=0.5,
+    )
+    parser.add_argument(
+        "--shard-verses",
+        help="Split books longer than this many verses into chapter-aligned "
+        "shards and lay them out in parallel across --jobs workers "
+        "(default: 0, never split)",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--volume",
+        help="Combine all input files into this single PDF, in canonical book "
+        "order, instead of writing one PDF per book",
+        default=None,
+    )
+    parser.add_argument(
+        "--timeout",
+        help="Seconds a book may take to convert before its worker process is "
+        "killed (default: no limit)",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--max-memory",
+        help="MiB of memory a worker process may use while converting a book "
+        "before it is killed (default: no limit; needs /proc)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--max-renders",
+        help="Replace each worker process after it has converted this many "
+        "books (default: never)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--recycle-memory",
+        help="Replace a worker process once its peak memory use passes this "
+        "many MiB (default: never)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of books to convert in parallel (default: 1)",
+        type=int,
+        default=1,
+    )
+    args = parser.parse_args(argv)
+    if args.format == "pdf" and args.range:
+        parser.error("--range needs --format html or draft")
+    if args.pages is not None and args.format != "draft":
+        parser.error("--pages needs --format draft")
+    if args.pages is not None and args.pages < 1:
+        parser.error("--pages must be at least 1")
+    if args.format != "pdf" and args.volume:
+        parser.error("--volume only supports --format pdf")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.shard_verses < 0:
+        parser.error("--shard-verses can't be negative")
+    has_limits = args.timeout or args.max_memory or args.max_renders
+    if get_shard_verses(args) and (has_limits or args.recycle_memory):
+        parser.error(
+            "--timeout, --max-memory, --max-renders and --recycle-memory "
+            "don't apply to --shard-verses"
+        )
+    return args
 
 
 def read_usfm_file(file_path):
@@ -40,14 +264,14 @@ def read_usfm_file(file_path):
         return file.read()
 
 
-def get_output_filename(input_file, output_dir=None):
-    """Generate output filename by replacing extension with .pdf"""
+def get_output_filename(input_file, output_dir=None, extension=".pdf"):
+    """Generate output filename by replacing the input's extension with extension"""
     # Get the base filename without path
     base_name = os.path.basename(input_file)
 
     # Replace the extension with .pdf
     name_without_ext = os.path.splitext(base_name)[0]
-    pdf_filename = f"{name_without_ext}.pdf"
+    pdf_filename = f"{name_without_ext}{extension}"
 
     # If output directory is specified, use it
     if output_dir:
@@ -60,9 +284,629 @@ def get_output_filename(input_file, output_dir=None):
     return os.path.join(input_dir, pdf_filename)
 
 
+def convert_file(
+    input_file,
+    output_file,
+    render_options,
+    parse_cache=None,
+    timings=NO_TIMINGS,
+    shard_executor=None,
+    shard_verses=0,
+    preview=None,
+    html_cache=None,
+):
+    """
+    Read, parse and render a single USFM file to PDF, or to a preview.
+
+    The output is written to a temporary file and renamed to output_file once
+    complete, so a failed or interrupted render never leaves a partial file.
+    preview, from get_preview_options, selects standalone HTML or a draft PDF
+    of a passage or the first pages. html_cache, an html_cache.HtmlCache,
+    supplies the HTML of chapters generated by earlier runs.
+    """
+    from parse_cache import load_book
+    from preview import write_standalone_html
+
+    preview = preview or {}
+
+    # Read USFM file
+    with timings.stage("read"):
+        input_usfm_str = read_usfm_file(input_file)
+        if preview.get("range"):
+            # Cut the passage out before parsing, so nothing else is converted
+            input_usfm_str = select_usfm(
+                input_usfm_str,
+                load_index(input_file, input_usfm_str),
+                preview["range"],
+            )
+
+    # Parse USFM to USX, and that to the compact document model
+    with timings.stage("parse"):
+        book = load_book(input_usfm_str, parse_cache)
+
+    with atomic_output(output_file) as temp_file:
+        if preview.get("format") == "html":
+            # No layout at all: the browser does it
+            with timings.stage("html"):
+                write_standalone_html(
+                    book,
+                    temp_file,
+                    render_options["header"],
+                    render_options["custom_noto_url"],
+                    html_cache,
+                )
+        elif preview.get("max_pages"):
+            from pdf_generator import get_renderer
+
+            get_renderer(render_options["font_dir"]).render_first_pages(
+                book,
+                preview["max_pages"],
+                temp_file,
+                header=render_options["header"],
+                font_url=render_options["custom_noto_url"],
+                html_output=render_options.get("html_output"),
+                timings=timings,
+                pdf_options=render_options["pdf_options"],
+                html_cache=html_cache,
+            )
+        elif shard_executor is not None:
+            from sharding import usx_to_sharded_pdf
+
+            usx_to_sharded_pdf(
+                book,
+                temp_file,
+                shard_executor,
+                shard_verses,
+                timings=timings,
+                html_cache=html_cache,
+                **render_options,
+            )
+        else:
+            from pdf_generator import usx_to_pdf
+
+            usx_to_pdf(
+                book,
+                temp_file,
+                timings=timings,
+                html_cache=html_cache,
+                **render_options,
+            )
+
+
+def get_profile_path(profile_dir, input_file):
+    os.makedirs(profile_dir, exist_ok=True)
+    name_without_ext = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(profile_dir, f"{name_without_ext}.prof")
+
+
+def convert_job(job, shard_executor=None):
+    """
+    Convert one job, as built by plan_jobs.
+
+    Errors are caught and returned rather than raised so that a single bad
+    book does not abort the rest of the batch. When a shard_executor is given,
+    the book's shards are laid out on it in parallel.
+
+    Returns:
+        Tuple of (input_file, output_file, (failure kind, message) or None,
+        stage timings dict or None)
+    """
+    from html_cache import HtmlCache
+    from parse_cache import ParseCache
+
+    input_file, output_file = job["input_file"], job["output_file"]
+    parse_cache = ParseCache() if job["parse_cache"] else None
+    html_cache = HtmlCache() if job["html_cache"] else None
+    timings = StageTimings() if job["timings"] else NO_TIMINGS
+    profiler = cProfile.Profile() if job["profile_dir"] else None
+
+    error = None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        convert_file(
+            input_file,
+            output_file,
+            job["render_options"],
+            parse_cache,
+            timings,
+            shard_executor,
+            job["shard_verses"],
+            job["preview"],
+            html_cache,
+        )
+    except MemoryError:
+        error = ("memory", "ran out of memory")
+    except Exception as e:
+        error = ("error", str(e))
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(get_profile_path(job["profile_dir"], input_file))
+
+    stage_timings = timings.to_dict() if job["timings"] else None
+    return input_file, output_file, error, stage_timings
+
+
+def init_worker(render_options):
+    """Process pool initializer: compile the stylesheets once per worker."""
+    from pdf_generator import get_renderer
+
+    renderer = get_renderer(render_options["font_dir"])
+    renderer.warm(render_options["header"], render_options["custom_noto_url"])
+
+
+def get_render_options(args):
+    """Collect the usx_to_pdf keyword arguments from the command line."""
+    return {
+        "header": args.header,
+        "custom_noto_url": args.noto_url,
+        "font_dir": args.font_dir,
+        "pdf_options": get_pdf_options(
+            full_fonts=args.full_fonts,
+            hinting=args.hinting,
+            compression=args.compression,
+            deduplicate=args.deduplicate,
+        ),
+    }
+
+
+def get_preview_options(args):
+    """Collect the --format, --range and --pages options, or None for full PDFs."""
+    if args.format == "pdf":
+        return None
+    max_pages = args.pages
+    if args.format == "draft" and not args.range and not max_pages:
+        max_pages = DEFAULT_DRAFT_PAGES
+    return {"format": args.format, "range": args.range, "max_pages": max_pages}
+
+
+def get_output_label(args):
+    return "HTML" if args.format == "html" else "PDF"
+
+
+def get_shard_verses(args):
+    # Previews are small enough not to need sharding
+    return args.shard_verses if args.format == "pdf" else 0
+
+
+def get_layout_options(args, sharded=True):
+    """Collect the options that change the output beyond the render options."""
+    layout_options = {}
+    if args.format != "pdf":
+        layout_options["preview"] = get_preview_options(args)
+    if sharded and get_shard_verses(args):
+        layout_options["shard_verses"] = args.shard_verses
+    return layout_options
+
+
+def get_output_options(render_options, layout_options=None):
+    """Add non-default PDF options to layout_options for the build hash."""
+    pdf_options = render_options.get("pdf_options")
+    if pdf_options and pdf_options != get_pdf_options():
+        return dict(layout_options or {}, pdf_options=pdf_options)
+    return layout_options
+
+
+def get_build_hash(input_file, render_options, layout_options=None):
+    """Hash the input file and render options, or None if the input can't be read."""
+    try:
+        with open(input_file, "rb") as f:
+            usfm_data = f.read()
+    except OSError:
+        return None
+    return compute_build_hash(
+        usfm_data,
+        header=render_options["header"],
+        font_url=render_options["custom_noto_url"],
+        font_dir=render_options["font_dir"],
+        layout_options=get_output_options(render_options, layout_options),
+    )
+
+
+def describe_output(output_file):
+    """Return output_file with its size, for progress messages."""
+    try:
+        size = os.path.getsize(output_file)
+    except OSError:
+        return output_file
+    return f"{output_file} ({size / 1024:.1f} KiB)"
+
+
+def get_output_file(input_file, input_files, args):
+    """Determine the output filename for input_file."""
+    if len(input_files) == 1 and args.output:
+        # If only one file and output is specified, use the specified output
+        return args.output
+    # Otherwise, generate output filename based on input filename
+    return get_output_filename(
+        input_file, args.output_dir, OUTPUT_EXTENSIONS[args.format]
+    )
+
+
+def make_job(input_file, output_file, args, render_options):
+    job_options = render_options
+    if args.keep_html and args.format != "html":
+        html_output = os.path.splitext(output_file)[0] + ".html"
+        job_options = dict(render_options, html_output=html_output)
+
+    return {
+        "input_file": input_file,
+        "output_file": output_file,
+        "render_options": job_options,
+        "parse_cache": not args.no_parse_cache,
+        "html_cache": not args.no_html_cache,
+        "timings": args.timings or bool(args.timings_json),
+        "profile_dir": args.profile,
+        "shard_verses": get_shard_verses(args),
+        "preview": get_preview_options(args),
+    }
+
+
+def get_on_exist_policy(args):
+    """Resolve --on-exist, only prompting when there is a terminal to answer."""
+    if args.on_exist:
+        return args.on_exist
+    if args.no_overwrite:
+        return "skip"
+    return "ask" if sys.stdin.isatty() else "fail"
+
+
+def confirm_overwrite(input_file, output_file, policy):
+    """
+    Return True if output_file doesn't exist or may be overwritten.
+
+    Outputs whose build hash is unchanged have already been skipped by the
+    manifest check, so "newer" only has to compare modification times.
+
+    Raises:
+        FileExistsError: If output_file exists and policy is "fail"
+    """
+    if not os.path.exists(output_file):
+        return True
+
+    if policy == "overwrite":
+        return True
+    if policy == "skip":
+        print(f"Skipping {input_file} as {output_file} already exists.")
+        return False
+    if policy == "newer":
+        if os.path.getmtime(input_file) > os.path.getmtime(output_file):
+            return True
+        print(f"Skipping {input_file} as {output_file} is newer.")
+        return False
+    if policy == "fail":
+        raise FileExistsError(
+            f"{output_file} already exists (use --on-exist to overwrite or skip)"
+        )
+
+    response = (
+        input(f"File {output_file} already exists. Overwrite? (y/n): ")
+        .strip()
+        .lower()
+    )
+    if response != "y":
+        print(f"Skipping {input_file}")
+        return False
+    return True
+
+
+def plan_jobs(input_files, args, manifest):
+    """
+    Decide the output file for each input and drop the ones to skip.
+
+    Returns:
+        Tuple of (jobs, build hash for each output file, list of
+        (input_file, (failure kind, message)) for inputs refused by the
+        --on-exist policy)
+    """
+    render_options = get_render_options(args)
+    policy = get_on_exist_policy(args)
+    jobs = []
+    build_hashes = {}
+    failures = []
+    for input_file in input_files:
+        # Determine output filename
+        output_file = get_output_file(input_file, input_files, args)
+
+        # Skip outputs that were already built from identical inputs
+        build_hash = get_build_hash(
+            input_file, render_options, get_layout_options(args)
+        )
+        if not args.force and manifest.is_current(output_file, build_hash):
+            print(f"Skipping {input_file} as {output_file} is up to date.")
+            continue
+
+        # Check if output_file exists and confirm overwrite
+        try:
+            if not confirm_overwrite(input_file, output_file, policy):
+                continue
+        except FileExistsError as e:
+            print(f"Error processing {input_file}: {e}")
+            failures.append((input_file, ("exists", str(e))))
+            continue
+
+        jobs.append(make_job(input_file, output_file, args, render_options))
+        build_hashes[output_file] = build_hash
+    return jobs, build_hashes, failures
+
+
+def get_worker_limits(args):
+    """Collect the WorkerPool limits from the command line, or {} if none are set."""
+    limits = {
+        "timeout": args.timeout,
+        "max_memory": args.max_memory and args.max_memory * 2**20,
+        "max_tasks": args.max_renders,
+        "recycle_memory": args.recycle_memory and args.recycle_memory * 2**20,
+    }
+    if limits["max_memory"] and not can_measure_rss():
+        print("Warning: --max-memory needs /proc and is ignored on this system")
+    return {name: value for name, value in limits.items() if value}
+
+
+def fail_job(job, kind, message, pid):
+    """Result for a job whose worker process was killed or died."""
+    remove_temp_files(job["output_file"], pid)
+    return job["input_file"], job["output_file"], (kind, message), None
+
+
+def run_jobs(jobs, num_workers=1, shard_verses=0, limits=None):
+    """
+    Convert all jobs, sequentially or across a pool of worker processes.
+
+    With shard_verses, books are converted one after another and the pool is
+    used to lay out the shards of each book instead; limits don't apply then.
+    Otherwise, with more than one worker or any limits (from
+    get_worker_limits), every book is converted in an isolated worker that is
+    killed if the book breaks a limit.
+
+    Results are yielded in job order, regardless of which worker finishes first.
+    """
+    if not jobs:
+        return
+
+    if shard_verses:
+        from sharding import init_shard_worker
+
+        render_options = jobs[0]["render_options"]
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=init_shard_worker,
+            initargs=(render_options["custom_noto_url"], render_options["font_dir"]),
+        ) as executor:
+            for job in jobs:
+                print(f"Processing {job['input_file']} -> {job['output_file']}")
+                yield convert_job(job, executor)
+        return
+
+    if not limits and (num_workers <= 1 or len(jobs) <= 1):
+        for job in jobs:
+            print(f"Processing {job['input_file']} -> {job['output_file']}")
+            yield convert_job(job)
+        return
+
+    # Standalone HTML never touches WeasyPrint, so there's nothing to warm
+    preview = jobs[0]["preview"]
+    html_only = preview is not None and preview["format"] == "html"
+    pool = WorkerPool(
+        convert_job,
+        num_workers=min(num_workers, len(jobs)),
+        initializer=None if html_only else init_worker,
+        initargs=(jobs[0]["render_options"],),
+        **(limits or {}),
+    )
+    yield from pool.map(jobs, fail_job)
+
+
+def format_error(error):
+    """Format a (failure kind, message) pair for display."""
+    kind, message = error
+    return message if kind == "error" else f"{kind}: {message}"
+
+
+def format_failure_counts(failures):
+    """Summarise failures by kind, e.g. "timeout: 1, error: 2"."""
+    counts = {}
+    for _, (kind, _) in failures:
+        counts[kind] = counts.get(kind, 0) + 1
+    return ", ".join(
+        f"{kind}: {counts[kind]}" for kind in FAILURE_KINDS if kind in counts
+    )
+
+
+def get_volume_build_hash(input_files, render_options):
+    """Hash all volume inputs, or None if any of them can't be read."""
+    input_hashes = []
+    for input_file in sorted(input_files):
+        build_hash = get_build_hash(input_file, render_options)
+        if build_hash is None:
+            return None
+        input_hashes.append(build_hash)
+    return compute_build_hash(
+        "\n".join(input_hashes).encode("utf-8"),
+        header=render_options["header"],
+        font_url=render_options["custom_noto_url"],
+        font_dir=render_options["font_dir"],
+        layout_options=get_output_options(render_options, {"volume": True}),
+    )
+
+
+def convert_volume(
+    input_files, output_file, render_options, parse_cache=None, html_cache=None
+):
+    """
+    Convert many USFM files into a single PDF, in canonical book order.
+
+    Books are ordered by the code of their USX book element; unknown codes
+    go last. All books share one set of stylesheets and font subsets.
+    """
+    from parse_cache import load_book
+    from pdf_generator import get_renderer
+
+    books = []
+    for input_file in input_files:
+        books.append(load_book(read_usfm_file(input_file), parse_cache))
+    books.sort(key=lambda book: get_book_sort_key(book.code))
+
+    renderer = get_renderer(render_options["font_dir"])
+    with atomic_output(output_file) as temp_file:
+        renderer.render_volume(
+            books,
+            temp_file,
+            header=render_options["header"],
+            font_url=render_options["custom_noto_url"],
+            html_output=render_options.get("html_output"),
+            pdf_options=render_options["pdf_options"],
+            html_cache=html_cache,
+        )
+
+
+def run_volume(input_files, args, manifest):
+    """Build the --volume PDF from all input files; return the process exit code."""
+    render_options = get_render_options(args)
+    output_file = args.volume
+    build_hash = get_volume_build_hash(input_files, render_options)
+    if not args.force and manifest.is_current(output_file, build_hash):
+        print(f"Skipping volume as {output_file} is up to date.")
+        return 0
+    try:
+        if not confirm_overwrite("volume", output_file, get_on_exist_policy(args)):
+            return 0
+    except FileExistsError as e:
+        print(f"Error creating volume: {e}")
+        return 1
+
+    if args.keep_html:
+        render_options["html_output"] = os.path.splitext(output_file)[0] + ".html"
+    from html_cache import HtmlCache
+    from parse_cache import ParseCache
+
+    parse_cache = None if args.no_parse_cache else ParseCache()
+    html_cache = None if args.no_html_cache else HtmlCache()
+
+    print(f"Processing {len(input_files)} file(s) -> {output_file}")
+    try:
+        convert_volume(
+            input_files, output_file, render_options, parse_cache, html_cache
+        )
+    except Exception as e:
+        print(f"Error creating volume {output_file}: {str(e)}")
+        return 1
+
+    print(f"PDF created: {describe_output(output_file)}")
+    if build_hash is not None:
+        manifest.record(output_file, build_hash, args.input_pattern)
+    return 0
+
+
+def watch_job(job, connection):
+    """
+    Run a job in a watch-mode render process and send back the result.
+
+    convert_file moves the PDF into place only once it is complete, so
+    cancelling the process never leaves a partial PDF behind.
+    """
+    connection.send(convert_job(job))
+
+
+def get_watch_context():
+    # Forked render processes inherit the parent's warmed renderer, which
+    # keeps stylesheets and fonts warm between rebuilds
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def stop_render(render):
+    process, _, job, _ = render
+    process.terminate()
+    process.join()
+    remove_temp_files(job["output_file"], process.pid)
+
+
+def run_watch(args, manifest):
+    """
+    Re-render books whenever their input files change, until interrupted.
+
+    Each render runs in its own process, at most --jobs at a time; further
+    changed books wait their turn. When a newer save of a file arrives while it
+    is still rendering, the older render is cancelled.
+    """
+    render_options = get_render_options(args)
+    output_label = get_output_label(args)
+    if args.format != "html":
+        from pdf_generator import get_renderer
+
+        get_renderer(args.font_dir).warm(args.header, args.noto_url)
+    context = get_watch_context()
+    running = {}
+    # Changed books waiting for a render process, oldest change first
+    queued = {}
+
+    print(f"Watching {args.input_pattern} for changes (Ctrl+C to stop)")
+    try:
+        for changed_files in watch_files(args.input_pattern, args.debounce):
+            input_files = glob.glob(os.path.expanduser(args.input_pattern))
+            for input_file in changed_files:
+                output_file = get_output_file(input_file, input_files, args)
+                # Watch mode renders books whole, without sharding
+                build_hash = get_build_hash(
+                    input_file, render_options, get_layout_options(args, sharded=False)
+                )
+                if input_file in running:
+                    stop_render(running.pop(input_file))
+                    print(f"Cancelled outdated render of {input_file}")
+                elif input_file in queued:
+                    del queued[input_file]
+                elif not args.force and manifest.is_current(output_file, build_hash):
+                    continue
+
+                job = make_job(input_file, output_file, args, render_options)
+                queued[input_file] = (job, build_hash)
+
+            for input_file, render in list(running.items()):
+                process, receiver, job, build_hash = render
+                if receiver.poll():
+                    _, output_file, error, _ = receiver.recv()
+                elif not process.is_alive():
+                    output_file = job["output_file"]
+                    error = (
+                        "crash",
+                        f"render process exited with code {process.exitcode}",
+                    )
+                else:
+                    continue
+
+                process.join()
+                del running[input_file]
+                if error is None:
+                    print(f"{output_label} created: {describe_output(output_file)}")
+                    if build_hash is not None:
+                        manifest.record(output_file, build_hash, input_file)
+                else:
+                    print(f"Error processing {input_file}: {format_error(error)}")
+
+            while queued and len(running) < args.jobs:
+                input_file = next(iter(queued))
+                job, build_hash = queued.pop(input_file)
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=watch_job, args=(job, sender))
+                process.start()
+                sender.close()
+                running[input_file] = (process, receiver, job, build_hash)
+                print(f"Processing {input_file} -> {job['output_file']}")
+    except KeyboardInterrupt:
+        for render in running.values():
+            stop_render(render)
+
+
 if __name__ == "__main__":
     args = parse_arguments()
 
+    if args.watch:
+        run_watch(args, BuildManifest())
+        sys.exit(0)
+
     # Expand the glob pattern to get all matching files
     input_files = glob.glob(os.path.expanduser(args.input_pattern))
 
@@ -70,47 +914,53 @@ if __name__ == "__main__":
         print(f"No files found matching pattern: {args.input_pattern}")
         exit(1)
 
-    # Process each file
-    for input_file in input_files:
-        try:
-            # Determine output filename
-            if len(input_files) == 1 and args.output:
-                # If only one file and output is specified, use the specified output
-                output_file = args.output
-            else:
-                # Otherwise, generate output filename based on input filename
-                output_file = get_output_filename(input_file, args.output_dir)
-
-            # Check if output_file exists and confirm overwrite
-            if os.path.exists(output_file):
-                if args.no_overwrite:
-                    print(f"Skipping {input_file} as {output_file} already exists.")
-                    continue
-
-                response = (
-                    input(f"File {output_file} already exists. Overwrite? (y/n): ")
-                    .strip()
-                    .lower()
-                )
-                if response != "y":
-                    print(f"Skipping {input_file}")
-                    continue
+    manifest = BuildManifest()
+    if args.volume:
+        sys.exit(run_volume(input_files, args, manifest))
 
-            print(f"Processing {input_file} -> {output_file}")
+    jobs, build_hashes, failures = plan_jobs(input_files, args, manifest)
+    output_label = get_output_label(args)
+    num_planned = len(jobs) + len(failures)
 
-            # Read USFM file
-            input_usfm_str = read_usfm_file(input_file)
-
-            # Parse USFM to USX
-            my_parser = USFMParser(input_usfm_str)
-            usx_elem = my_parser.to_usx(ignore_errors=True)
+    # Process each file
+    timing_results = []
+    results = run_jobs(
+        jobs, args.jobs, get_shard_verses(args), get_worker_limits(args)
+    )
+    for index, (input_file, output_file, error, stage_timings) in enumerate(
+        results, start=1
+    ):
+        if stage_timings is not None:
+            timing_results.append((input_file, stage_timings))
+            if args.timings_json:
+                append_timings_json(
+                    args.timings_json, input_file, output_file, stage_timings
+                )
 
-            # Convert USX to PDF
-            usx_to_pdf(
-                usx_elem, output_file, header=args.header, custom_noto_url=args.noto_url
+        if error is None:
+            print(
+                f"[{index}/{len(jobs)}] {output_label} created: "
+                f"{describe_output(output_file)}"
             )
-
-        except Exception as e:
-            print(f"Error processing {input_file}: {str(e)}")
+            if build_hashes[output_file] is not None:
+                manifest.record(output_file, build_hashes[output_file], input_file)
+        else:
+            print(
+                f"[{index}/{len(jobs)}] Error processing {input_file}: "
+                f"{format_error(error)}"
+            )
+            failures.append((input_file, error))
 
     print(f"Processed {len(input_files)} file(s)")
+
+    if timing_results:
+        print(format_timings_table(timing_results))
+
+    if failures:
+        print(
+            f"{len(failures)} of {num_planned} file(s) failed "
+            f"({format_failure_counts(failures)}):"
+        )
+        for input_file, error in failures:
+            print(f"  {input_file}: {format_error(error)}")
+        sys.exit(1)
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from cache_utils import write_file_atomic
+from css_helper import generate_css
+from font_cache import DEFAULT_NOTO_URL
+from version import __version__
+
+MANIFEST_NAME = ".usfm2pdf-manifest.json"
+
+
+@lru_cache(maxsize=None)
+def get_package_version(package_name):
+    try:
+        return version(package_name)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def compute_build_hash(
+    usfm_data, header="", font_url=None, font_dir=None, layout_options=None
+):
+    """
+    Hash everything that determines the content of an output PDF.
+
+    Args:
+        usfm_data: Raw bytes of the input USFM file
+        header: Header text printed at the top of every page
+        font_url: Google Fonts CSS URL (None for the default Noto Serif)
+        font_dir: Directory of pre-provisioned fonts or the font cache
+        layout_options: Dict of any other options that change the output
+    """
+    build_hash = hashlib.sha256(usfm_data)
+    for part in [
+        header,
+        font_url or DEFAULT_NOTO_URL,
+        font_dir or "",
+        generate_css(header),
+        json.dumps(layout_options or {}, sort_keys=True),
+        __version__,
+        get_package_version("weasyprint"),
+    ]:
+        # Length-prefix each part so that adjacent fields can't run together
+        encoded = part.encode("utf-8")
+        build_hash.update(len(encoded).to_bytes(8, "big") + encoded)
+    return build_hash.hexdigest()
+
+
+class BuildManifest:
+    """
+    Records the build hash of each output PDF.
+
+    Entries are kept in a JSON file in each output directory, so a directory of
+    PDFs carries its own record of what it was built from.
+    """
+
+    def __init__(self):
+        self.manifests = {}
+
+    def get_entries(self, output_file):
+        output_dir = os.path.dirname(os.path.abspath(output_file))
+        if output_dir not in self.manifests:
+            manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    self.manifests[output_dir] = json.load(f)["outputs"]
+            except (OSError, ValueError, KeyError):
+                self.manifests[output_dir] = {}
+        return self.manifests[output_dir]
+
+    def is_current(self, output_file, build_hash):
+        """Return True if output_file exists and was built from build_hash."""
+        entry = self.get_entries(output_file).get(os.path.basename(output_file))
+        return (
+            entry is not None
+            and entry["hash"] == build_hash
+            and os.path.exists(output_file)
+        )
+
+    def record(self, output_file, build_hash, input_file):
+        """Record a successful build and save the manifest."""
+        entries = self.get_entries(output_file)
+        entries[os.path.basename(output_file)] = {
+            "hash": build_hash,
+            "input": os.path.abspath(input_file),
+        }
+        self.save(os.path.dirname(os.path.abspath(output_file)))
+
+    def save(self, output_dir):
+        manifest = {"version": 1, "outputs": self.manifests[output_dir]}
+        write_file_atomic(
+            os.path.join(output_dir, MANIFEST_NAME),
+            json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+        )
@@ -0,0 +1,72 @@
+import hashlib
+import os
+from usfm_grammar import USFMParser
+from cache_utils import get_cache_dir, prune_cache_dir, write_file_atomic
+from document_model import FORMAT_VERSION, Book, build_book
+from manifest import get_package_version
+
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed books, keyed by USFM content and usfm-grammar version.
+
+    Entries are serialized document_model.Book objects, which load several
+    times faster than the equivalent USX. Reading an entry refreshes its mtime,
+    and the least recently used entries are evicted once the cache grows
+    beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir or get_cache_dir("books")
+        self.max_bytes = max_bytes
+        self.parser_version = get_package_version("usfm-grammar")
+
+    def get_path(self, usfm_str):
+        key = hashlib.sha256(
+            f"{self.parser_version}\0{FORMAT_VERSION}\0".encode("utf-8")
+        )
+        key.update(usfm_str.encode("utf-8"))
+        return os.path.join(self.cache_dir, key.hexdigest() + ".book")
+
+    def get(self, usfm_str):
+        """Return the cached Book for usfm_str, or None on a miss."""
+        path = self.get_path(usfm_str)
+        try:
+            with open(path, "rb") as f:
+                book = Book.from_bytes(f.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return book
+
+    def put(self, usfm_str, book):
+        """Store book for usfm_str, then evict old entries if over max_bytes."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_file_atomic(self.get_path(usfm_str), book.to_bytes())
+            prune_cache_dir(self.cache_dir, self.max_bytes)
+        except OSError:
+            # Caching is best effort; without it the book is just parsed again
+            pass
+
+
+def parse_usfm(usfm_str):
+    """Parse USFM to a USX element."""
+    my_parser = USFMParser(usfm_str)
+    return my_parser.to_usx(ignore_errors=True)
+
+
+def load_book(usfm_str, parse_cache=None):
+    """Parse USFM to a document_model.Book, using parse_cache if one is given."""
+    if parse_cache is not None:
+        book = parse_cache.get(usfm_str)
+        if book is not None:
+            return book
+
+    book = build_book(parse_usfm(usfm_str))
+
+    if parse_cache is not None:
+        parse_cache.put(usfm_str, book)
+    return book
@@ -1,161 +1,308 @@
+import threading
+from collections import OrderedDict
 from weasyprint import HTML, CSS
 from weasyprint.text.fonts import FontConfiguration
-import tempfile
-import os
-from html import escape
+from functools import lru_cache
 from css_helper import generate_css
+from document_model import as_book
+from font_cache import DEFAULT_NOTO_URL, get_font_stylesheet
+from html_generator import generate_html_from_usx, iter_volume_html
+from pdf_optimize import write_document
+from timings import NO_TIMINGS
 
-DEFAULT_NOTO_URL = "https://fonts.googleapis.com/css2?family=Noto+Serif:ital,wght@0,100..900;1,100..900&display=swap"
+# How many page and how many font stylesheets a renderer keeps compiled; a
+# server may be sent any number of different headers
+MAX_CACHED_STYLESHEETS = 16
 
 
-def usx_to_pdf(usx_elem, output_file, header="", custom_noto_url=None):
+class PdfRenderer:
     """
-    Convert USX XML element to a formatted PDF file using WeasyPrint.
+    Render USX to PDF, compiling stylesheets once and reusing them across books.
 
-    Args:
-        usx_elem: The USX XML element from usfm-grammar
-        output_file: Path to the output PDF file
+    Page stylesheets are cached by header text and font stylesheets by font URL,
+    keeping the MAX_CACHED_STYLESHEETS most recently used of each. All of them
+    share one FontConfiguration, so the @font-face rules for a font are loaded
+    from the font cache (see font_cache.py) and registered only once.
     """
-    # Create HTML content from USX
-    html_content = generate_html_from_usx(usx_elem)
-
-    # Create CSS for styling
-    css_content = generate_css(header)
-
-    # Create temporary HTML file
-    with tempfile.NamedTemporaryFile(
-        suffix=".html", delete=False, mode="w", encoding="utf-8"
-    ) as f:
-        f.write(html_content)
-        temp_html_path = f.name
-
-    try:
-        # Generate PDF using WeasyPrint
-        html = HTML(filename=temp_html_path)
-        main_stylesheet = CSS(string=css_content)
-        font_url = custom_noto_url or DEFAULT_NOTO_URL
-        html.write_pdf(
-            output_file,
-            stylesheets=[
-                main_stylesheet,
-                font_url,
-            ],
+
+    def __init__(self, font_dir=None):
+        self.font_dir = font_dir
+        self.font_config = FontConfiguration()
+        self.page_stylesheets = OrderedDict()
+        self.font_stylesheets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_cached(self, cache, key, compile_stylesheet):
+        with self.lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        # Compiled outside the lock, so renders in other threads aren't held up
+        stylesheet = compile_stylesheet()
+        with self.lock:
+            cache[key] = stylesheet
+            if len(cache) > MAX_CACHED_STYLESHEETS:
+                cache.popitem(last=False)
+        return stylesheet
+
+    def get_page_stylesheet(self, header="", page_furniture=True):
+        return self.get_cached(
+            self.page_stylesheets,
+            (header, page_furniture),
+            lambda: CSS(
+                string=generate_css(header, page_furniture),
+                font_config=self.font_config,
+            ),
+        )
+
+    def get_font_stylesheet(self, font_url=None):
+        font_url = font_url or DEFAULT_NOTO_URL
+        return self.get_cached(
+            self.font_stylesheets,
+            font_url,
+            lambda: CSS(
+                **get_font_stylesheet(font_url, self.font_dir),
+                font_config=self.font_config,
+            ),
+        )
+
+    def get_stylesheets(self, header="", font_url=None, page_furniture=True):
+        return [
+            self.get_page_stylesheet(header, page_furniture),
+            self.get_font_stylesheet(font_url),
+        ]
+
+    def warm(self, header="", font_url=None, page_furniture=True):
+        """Compile stylesheets ahead of the first render (e.g. in a pool worker)."""
+        self.get_stylesheets(header, font_url, page_furniture)
+
+    def render(
+        self,
+        usx_elem,
+        target=None,
+        header="",
+        font_url=None,
+        html_output=None,
+        timings=None,
+        page_furniture=True,
+        pdf_options=None,
+        html_cache=None,
+    ):
+        """
+        Render a book to PDF.
+
+        Args:
+            usx_elem: The document_model.Book, or the USX XML element from
+                usfm-grammar
+            target: Output path or file object; None returns the PDF as bytes
+            header: Header text printed at the top of every page
+            font_url: Google Fonts CSS URL to use instead of Noto Serif
+            html_output: Optional path to also save the generated HTML (for debugging)
+            timings: Optional timings.StageTimings to record each stage in
+            page_furniture: Whether to print the running header and page numbers
+            pdf_options: Optional font embedding and compression options from
+                pdf_optimize.get_pdf_options
+            html_cache: Optional html_cache.HtmlCache to reuse the HTML of
+                unchanged chapters from
+        """
+        timings = timings or NO_TIMINGS
+
+        # Create HTML content from USX
+        with timings.stage("html"):
+            html_content = generate_html_from_usx(usx_elem, html_cache)
+
+        return self.render_html(
+            html_content,
+            target,
+            header=header,
+            font_url=font_url,
+            html_output=html_output,
+            timings=timings,
+            page_furniture=page_furniture,
+            pdf_options=pdf_options,
+        )
+
+    def render_volume(
+        self,
+        usx_elems,
+        target=None,
+        header="",
+        font_url=None,
+        html_output=None,
+        timings=None,
+        pdf_options=None,
+        html_cache=None,
+    ):
+        """
+        Render several books into a single PDF, in the order given.
+
+        Each book starts on a new page and gets a bookmark from its title.
+        Stylesheets, fonts and font subsets are shared by the whole volume.
+        Arguments are as for render().
+        """
+        timings = timings or NO_TIMINGS
+
+        with timings.stage("html"):
+            html_content = "".join(iter_volume_html(usx_elems, html_cache))
+
+        return self.render_html(
+            html_content,
+            target,
+            header=header,
+            font_url=font_url,
+            html_output=html_output,
+            timings=timings,
+            pdf_options=pdf_options,
         )
-        print(f"PDF created: {output_file}")
-    finally:
-        # Clean up temporary file
-        os.unlink(temp_html_path)
-
-
-def generate_html_from_usx(usx_elem):
-    """Generate HTML content from USX element."""
-    # Start with HTML structure
-    html = [
-        "<!DOCTYPE html>",
-        "<html>",
-        "<head>",
-        '<meta charset="UTF-8">',
-        "<title>Bible Text</title>",
-        "</head>",
-        "<body>",
-        '<div class="side-notice">FOR REVIEW - NOTE: This document does not reflect all USFM content. Footnotes and other elements are omitted.</div>',
-        '<div class="bible-content">',
-    ]
-
-    # Process USX elements
-    book_title = ""
-    current_chapter = ""
-    has_printed_current_chapter = False
-    introductory_material = True
-
-    for elem in usx_elem.iter():
-        if elem.tag == "book":
-            book_title = elem.text or elem.get("code", "")
-            html.append(f'<h1 class="book-title">{escape(book_title)}</h1>')
-
-        elif elem.tag == "chapter":
-            chapter_num = elem.get("number", "")
-            if chapter_num:
-                introductory_material = False
-                current_chapter = chapter_num
-                has_printed_current_chapter = False
-                # html.append(f'<h2 class="chapter-number">Chapter {escape(chapter_num)}</h2>')
-
-        elif elem.tag == "para":
-            style_name = elem.get("style", "p")
-
-            # Determine paragraph class based on style
-            para_class = "paragraph"
-            if style_name in ["s", "s1", "s2"]:  # Section heading
-                para_class = "section-heading"
-            elif style_name == "q1":  # Poetry line
-                para_class = "poetry-q1"
-            elif style_name == "q2":  # Poetry line 2
-                para_class = "poetry-q2"
-            elif style_name == "b":  # Blank line
-                html.append('<div class="blank-line"></div>')
-                continue
-            elif introductory_material:
-                para_class = "introductory-material"
-
-            should_maybe_print_chapter = not (
-                para_class == "introductory-material" or para_class == "section-heading"
-            )
-            # Start paragraph
-            if should_maybe_print_chapter and not has_printed_current_chapter:
-                # We are going to add the chapter number to the first paragraph of the chapter
-                # so we need to suppress the indent
-                html.append(f'<p class="{para_class} suppress-indent">')
-                html.append(
-                    f'<span class="chapter-number">{escape(current_chapter)}</span>'
-                )
-                has_printed_current_chapter = True
-            else:
-                html.append(f'<p class="{para_class}">')
-
-            # Process paragraph content
-            if elem.text:
-                html.append(escape(elem.text))
-
-            for child in elem:
-                if child.tag == "verse" and child.get("number"):
-                    verse_num = child.get("number")
-                    if verse_num != "1":
-                        html.append(
-                            f'<span class="verse-number">{escape(verse_num)}</span>'
-                        )
-
-                    # Add verse text
-                    if child.text:
-                        html.append(escape(child.text))
-
-                elif child.tag == "char":
-                    style = child.get("style", "")
-                    if style == "nd":  # Divine name
-                        html.append(
-                            f'<span class="divine-name">{escape(child.text or "")}</span>'
-                        )
-                    else:
-                        html.append(escape(child.text or ""))
 
+    def render_first_pages(
+        self,
+        usx_elem,
+        max_pages,
+        target=None,
+        header="",
+        font_url=None,
+        html_output=None,
+        timings=None,
+        pdf_options=None,
+        html_cache=None,
+    ):
+        """
+        Render only the first max_pages pages of a book, as a quick draft.
+
+        Rather than laying out the whole book, a prefix of its chapters is laid
+        out, doubling the prefix until it runs past max_pages (so the last page
+        kept is complete) or covers the whole book. Other arguments are as for
+        render().
+        """
+        timings = timings or NO_TIMINGS
+        book = as_book(usx_elem)
+        chapter_count = book.get_chapter_count()
+
+        # Roughly a page per chapter to start with
+        prefix_chapters = max_pages + 1
+        while True:
+            with timings.stage("html"):
+                if prefix_chapters < chapter_count:
+                    # Selections share the book's buffers, so this copies nothing
+                    prefix = book.select_first_chapters(prefix_chapters)
                 else:
-                    html.append(escape(child.text or ""))
+                    prefix = book
+                html_content = generate_html_from_usx(prefix, html_cache)
 
-                # Add tail text
-                if child.tail:
-                    html.append(escape(child.tail))
+            document = self.render_document(
+                html_content,
+                header=header,
+                font_url=font_url,
+                html_output=html_output,
+                timings=timings,
+            )
+            if len(document.pages) > max_pages or prefix is book:
+                break
+            prefix_chapters *= 2
 
-            # End paragraph
-            html.append("</p>")
+        with timings.stage("write"):
+            document = document.copy(document.pages[:max_pages])
+            return write_document(document, target, pdf_options)
 
-    # Add side note
-    html.append(
-        '<div class="side-note">DRAFT: This PDF does not reflect all USFM content. Footnotes and other elements are omitted.</div>'
-    )
+    def render_html(
+        self,
+        html_content,
+        target=None,
+        header="",
+        font_url=None,
+        html_output=None,
+        timings=None,
+        page_furniture=True,
+        pdf_options=None,
+    ):
+        """Render generated HTML to PDF. Arguments are as for render()."""
+        timings = timings or NO_TIMINGS
+        document = self.render_document(
+            html_content,
+            header=header,
+            font_url=font_url,
+            html_output=html_output,
+            timings=timings,
+            page_furniture=page_furniture,
+        )
+
+        with timings.stage("write"):
+            return write_document(document, target, pdf_options)
+
+    def render_document(
+        self,
+        html_content,
+        header="",
+        font_url=None,
+        html_output=None,
+        timings=None,
+        page_furniture=True,
+    ):
+        """
+        Lay out generated HTML without writing it.
+
+        Returns:
+            The WeasyPrint Document, e.g. for its pages before writing the PDF
+            with pdf_optimize.write_document
+        """
+        timings = timings or NO_TIMINGS
+
+        if html_output:
+            with open(html_output, "w", encoding="utf-8") as f:
+                f.write(html_content)
+
+        with timings.stage("css"):
+            stylesheets = self.get_stylesheets(header, font_url, page_furniture)
 
-    # Close HTML structure
-    html.append("</div>")  # Close bible-content
-    html.append("</body>")
-    html.append("</html>")
+        # Lay out the document with WeasyPrint, straight from the in-memory HTML
+        with timings.stage("layout"):
+            return HTML(string=html_content).render(
+                stylesheets=stylesheets, font_config=self.font_config
+            )
+
+
+@lru_cache(maxsize=None)
+def get_renderer(font_dir=None):
+    """Return the renderer shared by every conversion in this process."""
+    return PdfRenderer(font_dir)
+
+
+def usx_to_pdf(
+    usx_elem,
+    output_file,
+    header="",
+    custom_noto_url=None,
+    font_dir=None,
+    html_output=None,
+    timings=None,
+    pdf_options=None,
+    html_cache=None,
+):
+    """
+    Convert a book to a formatted PDF file using WeasyPrint.
 
-    return "\n".join(html)
+    Args:
+        usx_elem: The document_model.Book, or the USX XML element from
+            usfm-grammar
+        output_file: Path to the output PDF file
+        header: Header text printed at the top of every page
+        custom_noto_url: Google Fonts CSS URL to use instead of Noto Serif
+        font_dir: Directory of pre-provisioned fonts or the font cache to use
+        html_output: Optional path to also save the generated HTML (for debugging)
+        timings: Optional timings.StageTimings to record each stage in
+        pdf_options: Optional font embedding and compression options from
+            pdf_optimize.get_pdf_options
+        html_cache: Optional html_cache.HtmlCache to reuse the HTML of unchanged
+            chapters from
+    """
+    get_renderer(font_dir).render(
+        usx_elem,
+        output_file,
+        header=header,
+        font_url=custom_noto_url,
+        html_output=html_output,
+        timings=timings,
+        pdf_options=pdf_options,
+        html_cache=html_cache,
+    )
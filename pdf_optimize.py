@@ -0,0 +1,90 @@
+import io
+
+# Options handled by WeasyPrint's own PDF writer
+WEASYPRINT_PDF_OPTIONS = ("full_fonts", "hinting", "uncompressed_pdf")
+
+COMPRESSION_CHOICES = ("none", "default", "max")
+
+
+def get_pdf_options(
+    full_fonts=False, hinting=False, compression="default", deduplicate=False
+):
+    """
+    Build the pdf_options dict accepted by PdfRenderer.
+
+    Args:
+        full_fonts: Embed whole fonts instead of subsets of the glyphs used
+        hinting: Keep hinting instructions in embedded fonts
+        compression: "none" for uncompressed streams, "default" for WeasyPrint's
+            compression, or "max" to recompress page content at zlib level 9
+        deduplicate: Merge identical objects, such as font streams repeated
+            across merged shards
+    """
+    return {
+        "full_fonts": full_fonts,
+        "hinting": hinting,
+        "uncompressed_pdf": compression == "none",
+        "compress_level": 9 if compression == "max" else None,
+        "deduplicate": deduplicate or compression == "max",
+    }
+
+
+def needs_postprocessing(pdf_options):
+    return bool(
+        pdf_options
+        and (
+            pdf_options.get("compress_level") is not None
+            or pdf_options.get("deduplicate")
+        )
+    )
+
+
+def get_weasyprint_options(pdf_options):
+    return {
+        name: pdf_options[name]
+        for name in WEASYPRINT_PDF_OPTIONS
+        if pdf_options and name in pdf_options
+    }
+
+
+def optimize_writer(writer, pdf_options):
+    """Apply recompression and deduplication to a pypdf PdfWriter in place."""
+    if pdf_options.get("compress_level") is not None:
+        for page in writer.pages:
+            page.compress_content_streams(level=pdf_options["compress_level"])
+    if pdf_options.get("deduplicate"):
+        writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+
+
+def write_output(data, target):
+    """Write PDF bytes to a path or file object, or return them if target is None."""
+    if target is None:
+        return data
+    if hasattr(target, "write"):
+        target.write(data)
+    else:
+        with open(target, "wb") as f:
+            f.write(data)
+    return None
+
+
+def write_document(document, target, pdf_options=None):
+    """
+    Write a rendered WeasyPrint document, applying the given pdf_options.
+
+    Returns:
+        The PDF bytes if target is None, like Document.write_pdf
+    """
+    weasyprint_options = get_weasyprint_options(pdf_options)
+    if not needs_postprocessing(pdf_options):
+        return document.write_pdf(target, **weasyprint_options)
+
+    # Imported here as main.py uses this module for its options at startup
+    from pypdf import PdfReader, PdfWriter
+
+    pdf = document.write_pdf(**weasyprint_options)
+    writer = PdfWriter(clone_from=PdfReader(io.BytesIO(pdf)))
+    optimize_writer(writer, pdf_options)
+    output = io.BytesIO()
+    writer.write(output)
+    return write_output(output.getvalue(), target)
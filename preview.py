@@ -0,0 +1,28 @@
+from css_helper import generate_css
+from font_cache import DEFAULT_NOTO_URL
+from html_generator import iter_standalone_html
+
+
+def write_standalone_html(
+    usx_elem, output_file, header="", custom_noto_url=None, html_cache=None
+):
+    """
+    Write a book as a single HTML file styled like the PDF, without layout.
+
+    Args:
+        usx_elem: The document_model.Book, or the USX XML element from
+            usfm-grammar
+        output_file: Path to the output HTML file
+        header: Header text, used by the print stylesheet's running header
+        custom_noto_url: Google Fonts CSS URL to use instead of Noto Serif
+        html_cache: Optional html_cache.HtmlCache to reuse the HTML of unchanged
+            chapters from
+    """
+    with open(output_file, "w", encoding="utf-8") as f:
+        for chunk in iter_standalone_html(
+            usx_elem,
+            generate_css(header),
+            custom_noto_url or DEFAULT_NOTO_URL,
+            html_cache,
+        ):
+            f.write(chunk)
@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import socketserver
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from api import render_usfm, warm_renderer
+from html_cache import HtmlCache
+from parse_cache import ParseCache
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Serve USFM to PDF conversion over HTTP with a warmed renderer"
+    )
+    parser.add_argument("--host", help="Address to listen on", default="127.0.0.1")
+    parser.add_argument("--port", help="Port to listen on", type=int, default=8000)
+    parser.add_argument(
+        "--socket",
+        help="Listen on this Unix socket path instead of a TCP port",
+        default=None,
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of render worker processes (default: 2)",
+        type=int,
+        default=2,
+    )
+    parser.add_argument(
+        "--max-queue",
+        help="Number of requests allowed to wait for a worker before new ones "
+        "are rejected with 503 (default: 8)",
+        type=int,
+        default=8,
+    )
+    parser.add_argument(
+        "--max-body-mb",
+        help="Largest accepted USFM upload in MiB (default: 20)",
+        type=float,
+        default=20,
+    )
+    parser.add_argument(
+        "--header", help="Default header text (overridable per request)", default=""
+    )
+    parser.add_argument(
+        "--noto-url",
+        help="Custom Noto font URL (Google Fonts) to support specific script",
+        default=None,
+    )
+    parser.add_argument(
+        "--font-dir",
+        help="Directory of pre-provisioned font files, or the font cache to use",
+        default=None,
+    )
+    parser.add_argument(
+        "--no-parse-cache",
+        help="Always parse the USFM instead of reusing cached books",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--no-html-cache",
+        help="Always generate the HTML of every chapter instead of reusing cached HTML",
+        action="store_true",
+        default=False,
+    )
+    return parser.parse_args()
+
+
+def init_worker(header, font_url, font_dir):
+    """Process pool initializer: compile stylesheets and load fonts up front."""
+    warm_renderer(header, font_url, font_dir)
+
+
+def render_in_worker(
+    usfm_str, header, font_url, font_dir, use_parse_cache, use_html_cache
+):
+    """Parse and render a USFM string in a worker process, returning a RenderResult."""
+    parse_cache = ParseCache() if use_parse_cache else None
+    html_cache = HtmlCache() if use_html_cache else None
+    return render_usfm(
+        usfm_str,
+        header=header,
+        font_url=font_url,
+        font_dir=font_dir,
+        parse_cache=parse_cache,
+        html_cache=html_cache,
+    )
+
+
+class RenderService:
+    """
+    A bounded pool of warmed render workers plus a cap on waiting requests.
+
+    At most workers + max_queue requests are admitted at once; the rest are
+    turned away immediately instead of piling up behind slow renders. If a
+    worker dies (e.g. killed for using too much memory), the broken pool is
+    replaced with a new one, and the restart is counted in the status.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.executor = self.start_executor()
+        # Start (and so warm) every worker now rather than on the first request
+        warmups = [self.executor.submit(int) for _ in range(args.workers)]
+        for warmup in warmups:
+            warmup.result()
+
+        self.capacity = args.workers + args.max_queue
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.lock = threading.Lock()
+        self.admitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.pool_restarts = 0
+
+    def start_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.args.workers,
+            initializer=init_worker,
+            initargs=(self.args.header, self.args.noto_url, self.args.font_dir),
+        )
+
+    def replace_executor(self, broken):
+        """Replace a broken pool, unless another request already has."""
+        with self.lock:
+            if self.executor is broken:
+                self.executor = self.start_executor()
+                self.pool_restarts += 1
+            executor = self.executor
+        broken.shutdown(wait=False)
+        return executor
+
+    def submit(self, *args):
+        executor = self.executor
+        try:
+            return executor, executor.submit(*args)
+        except BrokenProcessPool:
+            # The pool broke since the last render, so this request isn't to blame
+            executor = self.replace_executor(executor)
+            return executor, executor.submit(*args)
+
+    def try_admit(self):
+        if not self.slots.acquire(blocking=False):
+            return False
+        with self.lock:
+            self.admitted += 1
+        return True
+
+    def render(self, usfm_str, header):
+        """Render in a worker; only call after try_admit() returned True."""
+        try:
+            executor, future = self.submit(
+                render_in_worker,
+                usfm_str,
+                header,
+                self.args.noto_url,
+                self.args.font_dir,
+                not self.args.no_parse_cache,
+                not self.args.no_html_cache,
+            )
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                # A worker died during this render (or another one running
+                # alongside it); fail the request but keep serving
+                self.replace_executor(executor)
+                raise
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        finally:
+            self.slots.release()
+        with self.lock:
+            self.completed += 1
+        return result
+
+    def get_status(self):
+        with self.lock:
+            active = self.admitted - self.completed - self.failed
+            return {
+                "status": "ok",
+                "workers": self.args.workers,
+                "capacity": self.capacity,
+                "active": active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "pool_restarts": self.pool_restarts,
+            }
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /health returns service status as JSON.
+    POST /render takes a USFM body and returns the PDF; the optional "header"
+    query parameter overrides the server's default header.
+    """
+
+    service = None
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def send_text(self, status, message, content_type="text/plain; charset=utf-8"):
+        body = message.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            self.send_text(404, "Not found")
+            return
+        status = json.dumps(self.service.get_status())
+        self.send_text(200, status, "application/json")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/render":
+            self.send_text(404, "Not found")
+            return
+
+        content_length = self.headers.get("Content-Length")
+        if content_length is None:
+            self.send_text(411, "Content-Length required")
+            return
+        try:
+            body_size = int(content_length)
+        except ValueError:
+            body_size = -1
+        if body_size < 0:
+            self.send_text(400, "Invalid Content-Length")
+            return
+        if body_size > self.service.args.max_body_mb * 1024 * 1024:
+            self.send_text(413, "USFM body too large")
+            return
+        usfm_data = self.rfile.read(body_size)
+
+        try:
+            usfm_str = usfm_data.decode("utf-8-sig")
+        except UnicodeDecodeError as e:
+            self.send_text(400, f"USFM must be UTF-8: {e}")
+            return
+
+        header = parse_qs(url.query).get("header", [self.service.args.header])[0]
+
+        if not self.service.try_admit():
+            self.send_text(503, "Server busy, try again later")
+            return
+        try:
+            result = self.service.render(usfm_str, header)
+        except Exception as e:
+            self.send_text(500, f"Error rendering USFM: {e}")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(result.pdf)))
+        self.send_header("X-Page-Count", str(result.page_count))
+        self.end_headers()
+        self.wfile.write(result.pdf)
+
+
+class ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+
+def create_server(args, service):
+    RenderRequestHandler.service = service
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        return ThreadingUnixHTTPServer(args.socket, RenderRequestHandler)
+    return ThreadingHTTPServer((args.host, args.port), RenderRequestHandler)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    service = RenderService(args)
+    server = create_server(args, service)
+    address = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Serving USFM to PDF conversion on {address} with {args.workers} worker(s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.executor.shutdown(cancel_futures=True)
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
@@ -0,0 +1,147 @@
+import io
+from pypdf import PdfReader, PdfWriter
+from weasyprint import HTML
+from document_model import Book, as_book
+from html_generator import SIDE_NOTICE, write_html_from_usx
+from pdf_generator import get_renderer
+from pdf_optimize import get_weasyprint_options, optimize_writer
+from timings import NO_TIMINGS
+
+
+def split_book(book, max_verses):
+    """
+    Split a book into shards of roughly max_verses verses (see Book.split).
+
+    Returns:
+        List of serialized books, one per shard, each holding only its own text
+    """
+    return [shard.compact().to_bytes() for shard in book.split(max_verses)]
+
+
+def init_shard_worker(font_url=None, font_dir=None):
+    """Process pool initializer: compile the shard stylesheets once per worker."""
+    get_renderer(font_dir).warm(font_url=font_url, page_furniture=False)
+
+
+def render_shard(
+    shard_data, font_url=None, font_dir=None, pdf_options=None, html_cache=None
+):
+    """Lay out one shard without running header, page numbers or side notice."""
+    return get_renderer(font_dir).render(
+        Book.from_bytes(shard_data),
+        font_url=font_url,
+        page_furniture=False,
+        pdf_options=get_weasyprint_options(pdf_options),
+        html_cache=html_cache,
+    )
+
+
+def render_page_furniture(
+    page_count, header="", font_url=None, font_dir=None, pdf_options=None
+):
+    """
+    Render the running header, page numbers and side notice onto page_count
+    blank pages.
+
+    The pages use the same @page rules as a normal render, including the
+    @page:first handling, and the side notice sits on the first page only, so
+    the result can be overlaid onto the merged shards.
+    """
+    renderer = get_renderer(font_dir)
+    blank_pages = '<div style="break-after: page"></div>' * (page_count - 1)
+    html = HTML(
+        string=f"<html><body>{SIDE_NOTICE}{blank_pages}<div></div></body></html>"
+    )
+    return html.write_pdf(
+        stylesheets=renderer.get_stylesheets(header, font_url),
+        font_config=renderer.font_config,
+        **get_weasyprint_options(pdf_options),
+    )
+
+
+def usx_to_sharded_pdf(
+    usx_elem,
+    output_file,
+    executor,
+    max_verses,
+    header="",
+    custom_noto_url=None,
+    font_dir=None,
+    html_output=None,
+    timings=None,
+    pdf_options=None,
+    html_cache=None,
+):
+    """
+    Convert a book to PDF, laying out chapter shards in parallel.
+
+    Each shard is laid out by a worker from executor with empty page margins.
+    The shard PDFs are then concatenated, keeping the first shard's bookmarks,
+    and a single overlay document supplies the header, page numbering and
+    side notice across the joins. Every shard starts on a new page, so unlike
+    a normal render the page before each join may be partly empty.
+
+    Args:
+        usx_elem: The document_model.Book, or the USX XML element from
+            usfm-grammar
+        output_file: Path to the output PDF file
+        executor: A concurrent.futures executor initialized with init_shard_worker
+        max_verses: Approximate number of verses per shard
+        header: Header text printed at the top of every page
+        custom_noto_url: Google Fonts CSS URL to use instead of Noto Serif
+        font_dir: Directory of pre-provisioned fonts or the font cache to use
+        html_output: Optional path to also save the whole book's HTML (for debugging)
+        timings: Optional timings.StageTimings to record each stage in
+        pdf_options: Optional font embedding and compression options from
+            pdf_optimize.get_pdf_options
+        html_cache: Optional html_cache.HtmlCache to reuse the HTML of unchanged
+            chapters from, in the workers too
+    """
+    timings = timings or NO_TIMINGS
+    book = as_book(usx_elem)
+
+    with timings.stage("html"):
+        shards = split_book(book, max_verses)
+
+        if html_output:
+            with open(html_output, "w", encoding="utf-8") as f:
+                write_html_from_usx(book, f, html_cache)
+
+    if len(shards) == 1:
+        # Too small to be worth splitting
+        get_renderer(font_dir).render(
+            book,
+            output_file,
+            header=header,
+            font_url=custom_noto_url,
+            timings=timings,
+            pdf_options=pdf_options,
+            html_cache=html_cache,
+        )
+        return
+
+    with timings.stage("layout"):
+        futures = [
+            executor.submit(
+                render_shard, shard, custom_noto_url, font_dir, pdf_options, html_cache
+            )
+            for shard in shards
+        ]
+        writer = PdfWriter()
+        for future in futures:
+            writer.append(PdfReader(io.BytesIO(future.result())))
+
+    with timings.stage("write"):
+        furniture_pdf = render_page_furniture(
+            len(writer.pages), header, custom_noto_url, font_dir, pdf_options
+        )
+        for page, furniture_page in zip(
+            writer.pages, PdfReader(io.BytesIO(furniture_pdf)).pages
+        ):
+            page.merge_page(furniture_page)
+
+        # Each shard embeds its own font subsets; share whatever is identical
+        writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+        if pdf_options:
+            optimize_writer(writer, pdf_options)
+        writer.write(output_file)
@@ -0,0 +1,113 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+STAGES = ["read", "parse", "html", "css", "layout", "write"]
+
+
+def get_max_rss_bytes():
+    """Return the process's peak resident set size, or None if unknown."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StageTimings:
+    """
+    Record the wall time and peak memory of each pipeline stage for one book.
+
+    Peak memory is the peak Python heap during the stage as seen by
+    tracemalloc, which is started on first use. Tracing allocations slows
+    rendering down, so only create a StageTimings when timings were asked for.
+    The process-wide peak RSS at the end of each stage is recorded as well.
+    """
+
+    def __init__(self):
+        self.stages = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append(
+                {
+                    "name": name,
+                    "seconds": time.perf_counter() - start,
+                    "peak_bytes": tracemalloc.get_traced_memory()[1],
+                    "max_rss_bytes": get_max_rss_bytes(),
+                }
+            )
+
+    def to_dict(self):
+        return {
+            "stages": self.stages,
+            "total_seconds": sum(stage["seconds"] for stage in self.stages),
+        }
+
+
+@contextmanager
+def no_stage(name):
+    yield
+
+
+class NoTimings:
+    """Drop-in replacement for StageTimings that records nothing."""
+
+    stage = staticmethod(no_stage)
+
+
+NO_TIMINGS = NoTimings()
+
+
+def format_timings_table(results):
+    """
+    Format per-book stage timings as a text table.
+
+    Args:
+        results: List of (input_file, timings dict from StageTimings.to_dict)
+    """
+    name_width = max([len("book")] + [len(os.path.basename(f)) for f, _ in results])
+    columns = STAGES + ["total", "peak MiB"]
+    lines = [
+        "book".ljust(name_width) + "".join(f"{column:>10}" for column in columns)
+    ]
+    for input_file, timings in results:
+        seconds = {stage["name"]: stage["seconds"] for stage in timings["stages"]}
+        peak_bytes = max(stage["peak_bytes"] for stage in timings["stages"])
+        row = os.path.basename(input_file).ljust(name_width)
+        for stage_name in STAGES:
+            if stage_name in seconds:
+                row += f"{seconds[stage_name]:>10.3f}"
+            else:
+                row += f"{'-':>10}"
+        row += f"{timings['total_seconds']:>10.3f}"
+        row += f"{peak_bytes / (1024 * 1024):>10.1f}"
+        lines.append(row)
+    return "\n".join(lines)
+
+
+def append_timings_json(path, input_file, output_file, timings):
+    """Append one JSON line with a book's stage timings to path."""
+    record = {
+        "timestamp": time.time(),
+        "input_file": input_file,
+        "output_file": output_file,
+        **timings,
+    }
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import re
+from bisect import bisect_left, bisect_right
+from cache_utils import write_file_atomic
+
+INDEX_VERSION = 2
+
+# Markers kept ahead of a range that doesn't start at the book's first chapter
+HEADER_MARKERS = set(
+    """
+id usfm ide sts rem h h1 h2 h3 toc1 toc2 toc3 toca1 toca2 toca3
+mt mt1 mt2 mt3 mt4
+""".split()
+)
+
+# Body paragraph markers, which a verse's text can continue under
+PARAGRAPH_MARKERS = set(
+    """
+p m po pm pmo pmc pmr pi pi1 pi2 pi3 mi nb cls pc pr ph ph1 ph2 ph3
+q q1 q2 q3 q4 qr qc qa qm qm1 qm2 qm3 qd li li1 li2 li3 li4 lim lim1 lim2 b d tr
+""".split()
+)
+
+# Section headings and similar titles, which belong to the text that follows
+HEADING_MARKERS = set(
+    """
+s s1 s2 s3 s4 ms ms1 ms2 ms3 mr sr r sp sd sd1 sd2 sd3 sd4 cl cd
+""".split()
+)
+
+MARKER_PATTERN = re.compile(r"\\([a-z]+[0-9]*)(?![a-z0-9*])(?:[ \t]+([0-9]+))?")
+
+BRIDGE_PATTERN = re.compile(r"-([0-9]+)")
+
+RANGE_PATTERN = re.compile(r"(\d+)(?::(\d+))?(?:-(\d+)(?::(\d+))?)?")
+
+
+def parse_verse_range(text):
+    """
+    Parse a passage such as "12:1-15:21", "12-15", "12", "12:3-8" or "12:3".
+
+    A number after the dash is a verse when the start gave a verse and the end
+    gives no chapter ("12:3-8"), and a chapter otherwise ("12-15").
+
+    Returns:
+        Tuple of ((first chapter, first verse), (last chapter, last verse)),
+        where a verse of None means the whole chapter
+
+    Raises:
+        ValueError: If text isn't a valid passage
+    """
+    match = RANGE_PATTERN.fullmatch(text.replace(" ", ""))
+    if not match:
+        raise ValueError(f"invalid range: {text!r}")
+    first_chapter, first_verse, end, end_verse = (
+        int(group) if group else None for group in match.groups()
+    )
+    if end is None:
+        last = (first_chapter, first_verse)
+    elif end_verse is not None:
+        last = (end, end_verse)
+    elif first_verse is not None:
+        last = (first_chapter, end)
+    else:
+        last = (end, None)
+
+    if first_chapter < 1 or (last[0], last[1] or 0) < (first_chapter, first_verse or 0):
+        raise ValueError(f"invalid range: {text!r}")
+    return (first_chapter, first_verse), last
+
+
+def build_index(usfm_str):
+    """
+    Index the chapters, verses and paragraphs of a USFM book by offset.
+
+    Offsets are character offsets into usfm_str. For each chapter the index
+    holds its start and end, the verses as [number, offset, last number]
+    (bridges such as "4-6" under their first number, with 6 as the last) and
+    the body paragraphs as [offset, marker].
+    """
+    chapters = []
+    header_end = None
+    for match in MARKER_PATTERN.finditer(usfm_str):
+        marker, number = match.groups()
+        if marker == "c" and number:
+            if chapters:
+                chapters[-1]["end"] = match.start()
+            chapters.append(
+                {
+                    "number": int(number),
+                    "start": match.start(),
+                    "end": len(usfm_str),
+                    "verses": [],
+                    "paragraphs": [],
+                }
+            )
+        elif not chapters:
+            if header_end is None and marker not in HEADER_MARKERS:
+                header_end = match.start()
+        elif marker == "v" and number:
+            bridge = BRIDGE_PATTERN.match(usfm_str, match.end())
+            last_number = int(bridge.group(1)) if bridge else int(number)
+            chapters[-1]["verses"].append([int(number), match.start(), last_number])
+        elif marker in PARAGRAPH_MARKERS:
+            chapters[-1]["paragraphs"].append([match.start(), marker])
+
+    chapters_start = chapters[0]["start"] if chapters else len(usfm_str)
+    return {
+        "version": INDEX_VERSION,
+        "hash": hash_usfm(usfm_str),
+        "header_end": chapters_start if header_end is None else header_end,
+        "chapters_start": chapters_start,
+        "chapters": chapters,
+    }
+
+
+def hash_usfm(usfm_str):
+    return hashlib.sha256(usfm_str.encode("utf-8")).hexdigest()
+
+
+def get_index_path(input_file):
+    directory, name = os.path.split(input_file)
+    return os.path.join(directory, f".{name}.usfm2pdf-index.json")
+
+
+def load_index(input_file, usfm_str):
+    """
+    Return the index of usfm_str, the contents of input_file.
+
+    The index is cached in a hidden file next to input_file and rebuilt when
+    the contents change. If the cache can't be written, the index is simply
+    rebuilt next time.
+    """
+    index_path = get_index_path(input_file)
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION and index.get("hash") == hash_usfm(
+            usfm_str
+        ):
+            return index
+    except (OSError, ValueError):
+        pass
+
+    index = build_index(usfm_str)
+    try:
+        write_file_atomic(index_path, json.dumps(index).encode("utf-8"))
+    except OSError:
+        pass
+    return index
+
+
+def find_chapter(index, number):
+    for chapter in index["chapters"]:
+        if chapter["number"] == number:
+            return chapter
+    raise ValueError(f"chapter {number} not found")
+
+
+def find_verse_end(usfm_str, start, end):
+    """
+    Return where the text between start and end stops, before any headings and
+    empty paragraph markers it ends with, since those belong to what follows.
+    """
+    matches = list(MARKER_PATTERN.finditer(usfm_str, start, end))
+    cut = None
+    in_heading = False
+    for match, next_match in zip(matches, matches[1:] + [None]):
+        marker = match.group(1)
+        if marker in HEADING_MARKERS or marker in PARAGRAPH_MARKERS:
+            in_heading = marker in HEADING_MARKERS
+            cut = match.start() if cut is None else cut
+        elif not in_heading:
+            cut = None
+        # Skip the marker itself, but not a number after a paragraph marker
+        text_start = match.start() + len(marker) + 1
+        text_end = next_match.start() if next_match else end
+        if not in_heading and usfm_str[text_start:text_end].strip():
+            cut = None
+    return end if cut is None else cut
+
+
+def select_usfm(usfm_str, index, verse_range):
+    """
+    Cut a passage out of a USFM book, ready to be parsed on its own.
+
+    The book's header (\\id, running headers and titles) is kept; the
+    introduction only when the passage starts at the beginning of the first
+    chapter. A passage starting mid-chapter gets its chapter marker and the
+    marker of the paragraph the first verse is in, so it renders as it would
+    in the whole book. A passage ending mid-chapter stops before the headings
+    and paragraph markers that lead into the next verse.
+
+    Args:
+        usfm_str: The whole book
+        index: Its index, from build_index or load_index
+        verse_range: A range from parse_verse_range
+
+    Raises:
+        ValueError: If a chapter of the range, or its first verse, isn't in
+            the book
+    """
+    (first_chapter, first_verse), (last_chapter, last_verse) = verse_range
+    chapter = find_chapter(index, first_chapter)
+    verses = chapter["verses"]
+    if first_verse is not None and (not verses or first_verse > verses[-1][2]):
+        raise ValueError(f"verse {first_chapter}:{first_verse} not found")
+    verse_numbers = [number for number, _, _ in verses]
+    if first_verse is None or bisect_right(verse_numbers, first_verse) <= 1:
+        start = chapter["start"]
+        resume = ""
+    else:
+        # The last verse starting at or before first_verse, for bridges
+        start = verses[bisect_right(verse_numbers, first_verse) - 1][1]
+        paragraphs = chapter["paragraphs"]
+        position = bisect_left(paragraphs, [start]) - 1
+        marker = paragraphs[position][1] if position >= 0 else "p"
+        resume = f"\\c {first_chapter}\n\\{marker}\n"
+
+    if start == index["chapters_start"]:
+        header = usfm_str[:start]
+    else:
+        header = usfm_str[: index["header_end"]]
+
+    chapter = find_chapter(index, last_chapter)
+    end = chapter["end"]
+    if last_verse is not None:
+        verse_start = chapter["start"]
+        for number, offset, _ in chapter["verses"]:
+            if number > last_verse:
+                end = offset
+                break
+            verse_start = offset
+        end = find_verse_end(usfm_str, max(verse_start, start), end)
+
+    return header.rstrip() + "\n" + resume + usfm_str[start:end]
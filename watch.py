@@ -0,0 +1,47 @@
+import glob
+import os
+import time
+
+
+def get_file_signatures(pattern):
+    """Return {path: (mtime_ns, size)} for every file matching pattern."""
+    signatures = {}
+    for path in glob.glob(os.path.expanduser(pattern)):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signatures[path] = (stat.st_mtime_ns, stat.st_size)
+    return signatures
+
+
+def watch_files(pattern, debounce=0.5, poll_interval=0.2):
+    """
+    Poll a glob pattern and yield the files that changed, forever.
+
+    A file is reported once its size and mtime have stayed the same for
+    debounce seconds, so a burst of saves produces a single change. Files that
+    already exist when watching starts are reported as changed too.
+
+    Yields:
+        List of changed file paths after every poll (often empty), so the
+        caller can do its own housekeeping between changes
+    """
+    reported = {}
+    pending = {}
+    while True:
+        now = time.monotonic()
+        changed_files = []
+        for path, signature in get_file_signatures(pattern).items():
+            if reported.get(path) == signature:
+                pending.pop(path, None)
+                continue
+            if path not in pending or pending[path][0] != signature:
+                # New or still changing: restart its quiet period
+                pending[path] = (signature, now)
+            elif now - pending[path][1] >= debounce:
+                reported[path] = signature
+                del pending[path]
+                changed_files.append(path)
+        yield sorted(changed_files)
+        time.sleep(poll_interval)
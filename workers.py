@@ -0,0 +1,227 @@
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from timings import get_max_rss_bytes
+
+# Ways a task can fail, as reported in the batch summary
+FAILURE_KINDS = ["error", "timeout", "memory", "crash", "exists"]
+
+
+def get_rss_bytes(pid):
+    """Return the current resident set size of process pid, or None if unknown."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def describe_exit_code(exitcode):
+    if exitcode is not None and exitcode < 0:
+        try:
+            return f"worker was killed by {signal.Signals(-exitcode).name}"
+        except ValueError:
+            pass
+    return f"worker exited with code {exitcode}"
+
+
+def can_measure_rss():
+    return get_rss_bytes(os.getpid()) is not None
+
+
+def get_worker_context():
+    # Forked workers start without re-importing the program
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def worker_main(connection, function, initializer, initargs):
+    """Run tasks received over connection until told to stop."""
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        connection.send((function(task), get_max_rss_bytes()))
+
+
+class Worker:
+    """One isolated worker process and the task it is running, if any."""
+
+    def __init__(self, context, function, initializer, initargs):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=worker_main,
+            args=(child_connection, function, initializer, initargs),
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+        self.tasks_done = 0
+        self.index = None
+        self.task = None
+        self.started = None
+
+    def submit(self, index, task):
+        self.index, self.task, self.started = index, task, time.monotonic()
+        self.connection.send(task)
+
+    def finish(self):
+        self.index = self.task = self.started = None
+        self.tasks_done += 1
+
+    def stop(self):
+        """Ask the worker to exit after its current task."""
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join()
+        self.connection.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class WorkerPool:
+    """
+    Run a function over tasks in isolated worker processes, with limits.
+
+    Each task gets a wall-clock timeout, and each worker a memory cap that is
+    checked while it runs (where /proc is available). A worker that exceeds
+    either limit, or dies, is killed and replaced, and only its current task
+    fails. Workers are also recycled after max_tasks tasks or once their peak
+    RSS crosses recycle_memory, to contain memory growth and fragmentation.
+    """
+
+    def __init__(
+        self,
+        function,
+        num_workers=1,
+        initializer=None,
+        initargs=(),
+        timeout=None,
+        max_memory=None,
+        max_tasks=None,
+        recycle_memory=None,
+        poll_interval=0.1,
+    ):
+        """
+        Args:
+            function: Module-level function to call with each task
+            num_workers: Number of worker processes
+            initializer: Optional function each worker calls on startup
+            initargs: Arguments for initializer
+            timeout: Seconds a task may run before its worker is killed
+            max_memory: RSS in bytes a worker may reach before it is killed
+            max_tasks: Number of tasks after which a worker is replaced
+            recycle_memory: Peak RSS in bytes after which a worker is replaced
+            poll_interval: Seconds between checks of the running tasks
+        """
+        self.function = function
+        self.num_workers = num_workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self.timeout = timeout
+        self.max_memory = max_memory
+        self.max_tasks = max_tasks
+        self.recycle_memory = recycle_memory
+        self.poll_interval = poll_interval
+        self.context = get_worker_context()
+
+    def start_worker(self):
+        return Worker(self.context, self.function, self.initializer, self.initargs)
+
+    def needs_recycling(self, worker, max_rss):
+        if self.max_tasks and worker.tasks_done >= self.max_tasks:
+            return True
+        return bool(self.recycle_memory and max_rss and max_rss > self.recycle_memory)
+
+    def check_limits(self, worker):
+        """Return (kind, message) if the worker's running task broke a limit."""
+        if self.timeout and time.monotonic() - worker.started > self.timeout:
+            return "timeout", f"took longer than {self.timeout:g}s"
+        if self.max_memory:
+            rss = get_rss_bytes(worker.process.pid)
+            if rss is not None and rss > self.max_memory:
+                return "memory", f"used more than {self.max_memory // 2**20} MiB"
+        return None
+
+    def map(self, tasks, on_failure):
+        """
+        Yield function(task) for each task, in order.
+
+        Args:
+            tasks: List of tasks to run
+            on_failure: Called as on_failure(task, kind, message, pid) for a
+                task whose worker was killed or died; its return value is
+                yielded in place of the task's result
+
+        The kind is one of "timeout", "memory" or "crash".
+        """
+        results = {}
+        next_task = 0
+        next_result = 0
+        idle = []
+        busy = []
+        try:
+            while next_result < len(tasks):
+                # Hand out tasks, starting workers as needed
+                while next_task < len(tasks) and (
+                    idle or len(busy) < self.num_workers
+                ):
+                    worker = idle.pop() if idle else self.start_worker()
+                    worker.submit(next_task, tasks[next_task])
+                    busy.append(worker)
+                    next_task += 1
+
+                ready = wait(
+                    [worker.connection for worker in busy], self.poll_interval
+                )
+                for worker in list(busy):
+                    if worker.connection in ready:
+                        try:
+                            result, max_rss = worker.connection.recv()
+                        except (EOFError, OSError):
+                            worker.process.join()
+                            failure = (
+                                "crash",
+                                describe_exit_code(worker.process.exitcode),
+                            )
+                        else:
+                            results[worker.index] = result
+                            busy.remove(worker)
+                            worker.finish()
+                            if self.needs_recycling(worker, max_rss):
+                                worker.stop()
+                            else:
+                                idle.append(worker)
+                            continue
+                    else:
+                        failure = self.check_limits(worker)
+                        if failure is None:
+                            continue
+
+                    worker.kill()
+                    busy.remove(worker)
+                    results[worker.index] = on_failure(
+                        worker.task, *failure, worker.process.pid
+                    )
+
+                while next_result in results:
+                    yield results.pop(next_result)
+                    next_result += 1
+        finally:
+            for worker in idle:
+                worker.stop()
+            for worker in busy:
+                worker.kill()